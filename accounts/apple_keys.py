@@ -0,0 +1,107 @@
+import logging
+import re
+import threading
+import time
+
+import jwt
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Apple's signing keys (JWKS) are cached in process memory and in the shared
+# cache for as long as Apple's Cache-Control allows, so verifying a sign-in
+# token normally makes no HTTP request. A token signed with a key we do not
+# know yet (Apple rotated its keys) triggers a refresh; concurrent refreshes
+# in a process are collapsed into one request.
+
+APPLE_KEYS_CACHE_KEY = 'apple:jwks'
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+_keys = {}
+_expires_at = 0
+_fetched_at = 0
+_refresh_lock = threading.Lock()
+
+
+def get_apple_public_key(kid):
+    """
+    Return the public key Apple signs tokens with under key id `kid`, or None
+    if Apple does not publish such a key.
+    """
+    public_key = _get_cached_key(kid)
+    if public_key is not None:
+        return public_key
+
+    with _refresh_lock:
+        # Another thread may have refreshed the keys while we waited
+        public_key = _get_cached_key(kid)
+        if public_key is not None:
+            return public_key
+
+        if time.time() >= _expires_at:
+            _load_shared_keys()
+            public_key = _get_cached_key(kid)
+            if public_key is not None:
+                return public_key
+
+        # Unknown kids are usually rotations, but do not let a stream of
+        # forged kids turn into a stream of requests to Apple
+        if time.time() >= _expires_at or \
+           time.time() - _fetched_at >= settings.APPLE_KEYS_MIN_REFRESH_INTERVAL:
+            _fetch_keys()
+
+        return _keys.get(kid)
+
+
+def reset_apple_keys():
+    global _keys, _expires_at, _fetched_at
+    _keys, _expires_at, _fetched_at = {}, 0, 0
+    cache.delete(APPLE_KEYS_CACHE_KEY)
+
+
+def _get_cached_key(kid):
+    if time.time() < _expires_at:
+        return _keys.get(kid)
+    return None
+
+
+def _set_keys(jwks, expires_at):
+    global _keys, _expires_at
+    _keys = {jwk['kid']: jwt.algorithms.RSAAlgorithm.from_jwk(jwk)
+             for jwk in jwks}
+    _expires_at = expires_at
+
+
+def _load_shared_keys():
+    cached = cache.get(APPLE_KEYS_CACHE_KEY)
+    if cached is not None and time.time() < cached['expires_at']:
+        _set_keys(cached['keys'], cached['expires_at'])
+
+
+def _fetch_keys():
+    global _expires_at, _fetched_at
+    _fetched_at = time.time()
+    try:
+        response = requests.get(settings.APPLE_KEYS_URL,
+                                timeout=settings.APPLE_KEYS_TIMEOUT)
+        response.raise_for_status()
+        jwks = response.json()['keys']
+    except (requests.RequestException, ValueError, KeyError):
+        if not _keys:
+            raise
+        # Keep verifying against the keys we have until Apple is reachable,
+        # without every sign-in retrying the request behind the lock
+        logger.warning('Refreshing Apple signing keys failed', exc_info=True)
+        _expires_at = time.time() + settings.APPLE_KEYS_FAILURE_BACKOFF
+        return
+
+    max_age = _MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+    ttl = int(max_age.group(1)) if max_age else settings.APPLE_KEYS_DEFAULT_TTL
+    expires_at = time.time() + ttl
+
+    _set_keys(jwks, expires_at)
+    cache.set(APPLE_KEYS_CACHE_KEY,
+              {'keys': jwks, 'expires_at': expires_at}, ttl)
@@ -0,0 +1,14 @@
+from accounts.outbound import OUTBOUND_BATCH_SIZE, claim_outbound_messages, process_outbound_messages
+from petsocialmediabackend.outbox import QueueWorkerCommand
+
+
+class Command(QueueWorkerCommand):
+    help = 'Deliver queued Mailchimp subscriptions and admin emails.'
+    default_batch_size = OUTBOUND_BATCH_SIZE
+    success_message = 'Delivered {count} messages'
+
+    def claim(self, batch_size):
+        return claim_outbound_messages(batch_size)
+
+    def process(self, messages):
+        return process_outbound_messages(messages)
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
                                         PermissionsMixin)
 from django.db import models
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
 
 
@@ -58,3 +59,36 @@ class DeletedUserLog(models.Model):
 
     def __str__(self):
         return f"DeletedUserLog {self.anonymized_id} on {self.deletion_date}"
+
+
+class OutboundMessage(models.Model):
+    # Side effects of sign-up and reporting that talk to external services.
+    # They are queued here instead of being sent in the request and removed
+    # once delivered.
+    KIND_CHOICES = (
+        ('mailchimp_subscribe', 'Mailchimp Subscription'),
+        ('email', 'Email'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Not claimed by a worker before this time (retry backoff and lease)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='outbound_message_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.id} ({self.status})"
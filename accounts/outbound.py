@@ -0,0 +1,147 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from petsocialmediabackend.outbox import claim_due, record_failure
+
+from .models import OutboundMessage
+from .utils import add_subscribers_to_mailchimp
+
+logger = logging.getLogger(__name__)
+
+# Mailchimp subscriptions and admin emails are queued as OutboundMessage rows
+# so sign-up and reporting never wait on Mailchimp or SMTP. With the 'inline'
+# backend they are delivered right after the request's transaction commits,
+# with 'queue' they are left for the process_outbound_messages worker command,
+# which delivers each claimed batch with one Mailchimp request per
+# MAILCHIMP_BATCH_SIZE subscribers and a single SMTP connection.
+
+OUTBOUND_BATCH_SIZE = 100
+MAILCHIMP_BATCH_SIZE = 500
+ADMIN_EMAIL = 'admin@petzzl.app'
+
+
+def queue_mailchimp_subscription(user):
+    _queue('mailchimp_subscribe', {
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+    })
+
+
+def queue_admin_email(subject, message, from_email=None):
+    _queue('email', {
+        'subject': subject,
+        'message': message,
+        'from_email': from_email or settings.DEFAULT_FROM_EMAIL,
+        'recipient_list': [ADMIN_EMAIL],
+    })
+
+
+def _queue(kind, payload):
+    message = OutboundMessage.objects.create(kind=kind, payload=payload)
+    if settings.OUTBOUND_MESSAGES_BACKEND == 'inline':
+        transaction.on_commit(lambda: drain_outbound_messages([message.id]))
+
+
+def claim_outbound_messages(limit=OUTBOUND_BATCH_SIZE, ids=None):
+    messages = OutboundMessage.objects.all()
+    if ids is not None:
+        # Only the messages the caller queued, not whatever else is due
+        messages = messages.filter(id__in=ids)
+    return claim_due(messages, limit, settings.OUTBOUND_MESSAGES_LEASE)
+
+
+def process_outbound_messages(messages):
+    """
+    Deliver the claimed `messages`, Mailchimp subscriptions in batches and
+    emails over one SMTP connection, and return how many were delivered.
+    """
+    messages_by_kind = defaultdict(list)
+    for message in messages:
+        messages_by_kind[message.kind].append(message)
+
+    errors = {}
+    errors.update(_subscribe_to_mailchimp(
+        messages_by_kind['mailchimp_subscribe']))
+    errors.update(_send_emails(messages_by_kind['email']))
+
+    delivered_ids = [message.id for message in messages
+                     if message.id not in errors]
+    OutboundMessage.objects.filter(id__in=delivered_ids).delete()
+
+    now = timezone.now()
+    for message in messages:
+        if message.id in errors:
+            record_delivery_failure(message, errors[message.id], now)
+
+    return len(delivered_ids)
+
+
+def drain_outbound_messages(ids):
+    """
+    Deliver the queued messages with the given `ids` now. Returns the number
+    delivered.
+    """
+    try:
+        return process_outbound_messages(
+            claim_outbound_messages(len(ids), ids=ids))
+    except Exception:
+        # The messages stay queued and are retried once their lease expires
+        logger.exception('Delivering outbound messages failed')
+        return 0
+
+
+def _subscribe_to_mailchimp(messages):
+    errors = {}
+    for start in range(0, len(messages), MAILCHIMP_BATCH_SIZE):
+        batch = messages[start:start + MAILCHIMP_BATCH_SIZE]
+        try:
+            failed_emails = add_subscribers_to_mailchimp(
+                [message.payload for message in batch])
+        except Exception as e:
+            errors.update((message.id, str(e)) for message in batch)
+            continue
+        errors.update((message.id, failed_emails[message.payload['email']])
+                      for message in batch
+                      if message.payload['email'] in failed_emails)
+    return errors
+
+
+def _send_emails(messages):
+    if not messages:
+        return {}
+
+    errors = {}
+    try:
+        # One connection (and SMTP handshake) for the whole batch
+        with get_connection() as connection:
+            for message in messages:
+                email = EmailMessage(
+                    message.payload['subject'], message.payload['message'],
+                    message.payload['from_email'], message.payload['recipient_list'],
+                    connection=connection)
+                try:
+                    email.send()
+                except Exception as e:
+                    errors[message.id] = str(e)
+    except Exception as e:
+        # Opening or closing the connection failed
+        for message in messages:
+            errors.setdefault(message.id, str(e))
+    return errors
+
+
+def record_delivery_failure(message, error, now):
+    if record_failure(message, error, settings.OUTBOUND_MESSAGES_MAX_ATTEMPTS,
+                      settings.OUTBOUND_MESSAGES_RETRY_DELAY, now):
+        logger.error('Giving up delivering %s after %s attempts: %s',
+                     message, message.attempts, error)
+        if message.kind == 'mailchimp_subscribe':
+            queue_admin_email(
+                'Mailchimp Subscription Error',
+                f"Failed to add subscriber {message.payload['email']} to Mailchimp: {error}")
@@ -1,9 +1,7 @@
-from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 
-from .utils import add_subscriber_to_mailchimp
+from .outbound import queue_mailchimp_subscription
 
 User = get_user_model()
 
@@ -16,16 +14,7 @@ class UserCreateSerializer(BaseUserCreateSerializer):
     def save(self, **kwargs):
         user = super().save(**kwargs)  # Save the user instance
 
-        # Add the user to Mailchimp
-        try:
-            add_subscriber_to_mailchimp(
-                user.email, user.first_name, user.last_name)
-        except Exception as e:
-            # Send an email to admin if something goes wrong
-            subject = "Mailchimp Subscription Error"
-            message = f"Failed to add subscriber {user.email} to Mailchimp: {e}"
-            email_from = settings.DEFAULT_FROM_EMAIL
-            recipient_list = ['admin@petzzl.app']
-            send_mail(subject, message, email_from, recipient_list)
+        # Add the user to Mailchimp; the admin is emailed if it keeps failing
+        queue_mailchimp_subscription(user)
 
         return user
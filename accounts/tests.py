@@ -1,3 +1,92 @@
-from django.test import TestCase
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.test import SimpleTestCase, override_settings
+
+from .apple_keys import get_apple_public_key, reset_apple_keys
+
+
+def make_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    return dict(jwk, kid=kid, alg='RS256', use='sig')
+
+
+class JWKSStub(BaseHTTPRequestHandler):
+    # Set by the test: the keys served, their max-age and whether Apple is down
+    keys = []
+    max_age = 3600
+    down = False
+    request_count = 0
+
+    def do_GET(self):
+        type(self).request_count += 1
+        if self.down:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        body = json.dumps({'keys': self.keys}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Cache-Control', f'max-age={self.max_age}')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class AppleKeysTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), JWKSStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(
+            APPLE_KEYS_URL=f'http://127.0.0.1:{cls.server.server_port}/auth/keys',
+            APPLE_KEYS_MIN_REFRESH_INTERVAL=0)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        JWKSStub.keys = [make_jwk('key-1')]
+        JWKSStub.max_age = 3600
+        JWKSStub.down = False
+        JWKSStub.request_count = 0
+        reset_apple_keys()
+        self.addCleanup(reset_apple_keys)
+
+    def test_known_keys_are_served_from_cache(self):
+        for _ in range(5):
+            self.assertIsNotNone(get_apple_public_key('key-1'))
+        self.assertEqual(JWKSStub.request_count, 1)
+
+    def test_unknown_kid_refetches_the_keys(self):
+        self.assertIsNotNone(get_apple_public_key('key-1'))
+
+        # Apple rotated its keys
+        JWKSStub.keys = [make_jwk('key-1'), make_jwk('key-2')]
+        self.assertIsNotNone(get_apple_public_key('key-2'))
+        self.assertEqual(JWKSStub.request_count, 2)
+
+    def test_outage_keeps_serving_old_keys_without_refetching(self):
+        JWKSStub.max_age = 0
+        old_key = get_apple_public_key('key-1')
+
+        JWKSStub.down = True
+        with self.assertLogs('accounts.apple_keys', 'WARNING'):
+            for _ in range(5):
+                self.assertEqual(
+                    get_apple_public_key('key-1').public_numbers(), old_key.public_numbers())
+        # One failed refresh, then the old keys until the backoff passes
+        self.assertEqual(JWKSStub.request_count, 2)
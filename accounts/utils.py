@@ -3,24 +3,31 @@ import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from .apple_keys import get_apple_public_key
+
 User = get_user_model()
 
 
 def verify_apple_identity_token(token):
-    # Fetch Apple's public keys
-    apple_keys_response = requests.get('https://appleid.apple.com/auth/keys')
-    apple_public_keys = apple_keys_response.json()['keys']
-
-    for key in apple_public_keys:
-        try:
-            public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key)
-            decoded_token = jwt.decode(token, public_key, algorithms='RS256',
-                                       audience=settings.APPLE_CLIENT_ID, issuer='https://appleid.apple.com')
-            return decoded_token
-        except jwt.PyJWTError as e:
-            # Log the specific error
-            print(f"Token verification failed with error: {e}")
-    raise ValueError('Token verification failed')
+    try:
+        kid = jwt.get_unverified_header(token).get('kid')
+    except jwt.PyJWTError as e:
+        print(f"Token verification failed with error: {e}")
+        raise ValueError('Token verification failed')
+
+    # Pick the key Apple signed the token with
+    public_key = get_apple_public_key(kid)
+    if public_key is None:
+        print(f"Token verification failed: unknown key id {kid}")
+        raise ValueError('Token verification failed')
+
+    try:
+        return jwt.decode(token, public_key, algorithms='RS256',
+                          audience=settings.APPLE_CLIENT_ID, issuer='https://appleid.apple.com')
+    except jwt.PyJWTError as e:
+        # Log the specific error
+        print(f"Token verification failed with error: {e}")
+        raise ValueError('Token verification failed')
 
 
 def get_or_create_user(user_data, first_name=None, last_name=None):
@@ -42,29 +49,41 @@ def get_or_create_user(user_data, first_name=None, last_name=None):
     return user, created
 
 
-def add_subscriber_to_mailchimp(email, first_name, last_name):
-    # Only proceed if in the PROD environment
-    if settings.ENV == 'PROD':
-        url = f'https://us9.api.mailchimp.com/3.0/lists/{settings.MAILCHIMP_LIST_ID}/members/'
-        data = {
-            'email_address': email,
+def add_subscribers_to_mailchimp(subscribers):
+    """
+    Subscribe `subscribers` (dicts with email, first_name and last_name, at
+    most MAILCHIMP_BATCH_SIZE) with one batch request to the Mailchimp list.
+
+    Returns {email: error} for the subscribers that could not be added;
+    addresses already on the list count as added. Raises if the request
+    itself fails.
+    """
+    if settings.MAILCHIMP_BACKEND == 'console':
+        for subscriber in subscribers:
+            print(
+                f"Skipped adding subscriber {subscriber['email']} to Mailchimp since the console backend is in use.")
+        return {}
+
+    url = f'https://us9.api.mailchimp.com/3.0/lists/{settings.MAILCHIMP_LIST_ID}'
+    data = {
+        'members': [{
+            'email_address': subscriber['email'],
             'status': 'subscribed',
             'merge_fields': {
-                'FNAME': first_name,
-                'LNAME': last_name,
+                'FNAME': subscriber['first_name'],
+                'LNAME': subscriber['last_name'],
             },
-        }
-        headers = {
-            'Authorization': f'Bearer {settings.MAILCHIMP_API_KEY}',
-            'Content-Type': 'application/json'
-        }
+        } for subscriber in subscribers],
+        'update_existing': False,
+    }
+    headers = {
+        'Authorization': f'Bearer {settings.MAILCHIMP_API_KEY}',
+        'Content-Type': 'application/json'
+    }
 
-        response = requests.post(url, json=data, headers=headers)
-        if response.status_code != 200:
-            # Handle failure: log it, send a notification, etc.
-            print(
-                f"Failed to add subscriber {email} to Mailchimp: {response.json()}")
-    else:
-        # Optionally log that the function was called in a non-prod environment
-        print(
-            f"Skipped adding subscriber {email} to Mailchimp since environment is not PROD.")
+    response = requests.post(url, json=data, headers=headers,
+                             timeout=settings.MAILCHIMP_TIMEOUT)
+    response.raise_for_status()
+    return {error['email_address']: error['error']
+            for error in response.json().get('errors', [])
+            if error.get('error_code') != 'ERROR_CONTACT_EXISTS'}
@@ -1,6 +1,3 @@
-import os
-
-import boto3
 from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.http import JsonResponse
@@ -12,11 +9,12 @@ from rest_framework.views import APIView
 
 from accounts.models import DeletedUserLog
 from apps.mediaposts.models import Post
-from apps.mediaposts.views.delete_post_views import delete_media_from_digital_ocean
+from apps.mediaposts.storage_cleanup import get_media_storage_urls, schedule_storage_deletion
+from apps.mediaposts.teardown import delete_pet_profiles_in_bulk
 from apps.petprofiles.models import PetProfile
-from apps.petprofiles.views import delete_image_from_do_space
 
-from .utils import add_subscriber_to_mailchimp, get_or_create_user, verify_apple_identity_token
+from .outbound import queue_mailchimp_subscription
+from .utils import get_or_create_user, verify_apple_identity_token
 
 User = get_user_model()
 
@@ -48,40 +46,21 @@ class DeleteAccountView(APIView):
                 reason_detail=reason_detail
             )
 
-            # Retrieve all posts associated with the user
+            # Retrieve all posts and pet profiles associated with the user
             user_posts = Post.objects.filter(pet__user=user)
-
-            # Delete associated media from Digital Ocean
-            for post in user_posts:
-                for media in post.media.all():
-                    delete_media_from_digital_ocean(media.media_url)
-                    delete_media_from_digital_ocean(media.thumbnail_small_url)
-
-                # After deleting media, delete the post
-                post.delete()
-
-            # Initialize boto3 client for Digital Ocean
-            session = boto3.session.Session()
-            client = session.client(
-                's3',
-                region_name='sfo3',
-                endpoint_url='https://sfo3.digitaloceanspaces.com',
-                aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-            )
-
-            # Retrieve all pet profiles associated with the user
             user_pet_profiles = PetProfile.objects.filter(user=user)
 
-            # Delete profile pictures from Digital Ocean
+            # Queue post media and profile pictures for deletion from
+            # Digital Ocean
+            storage_urls = get_media_storage_urls(user_posts)
             for pet_profile in user_pet_profiles:
-                if pet_profile.profile_pic_regular:
-                    delete_image_from_do_space(
-                        client, pet_profile.profile_pic_regular)
-                if pet_profile.profile_pic_thumbnail_small:
-                    delete_image_from_do_space(
-                        client, pet_profile.profile_pic_thumbnail_small)
-                pet_profile.delete()  # Delete the pet profile after its images
+                storage_urls += [url for url in (pet_profile.profile_pic_regular,
+                                                 pet_profile.profile_pic_thumbnail_small) if url]
+            schedule_storage_deletion(storage_urls)
+
+            # Delete the pet profiles, their posts and everything attached
+            # to them with set-based deletes
+            delete_pet_profiles_in_bulk(user_pet_profiles)
 
             # Now, delete the user
             user.delete()
@@ -109,13 +88,7 @@ def apple_sign_in(request):
 
         # Check if the user was created to avoid adding existing users to Mailchimp again
         if created:
-            try:
-                add_subscriber_to_mailchimp(
-                    user.email, user.first_name, user.last_name)
-            except Exception as e:
-                # Log the error but do not disrupt the user creation process
-                print(
-                    f"Failed to add subscriber {user.email} to Mailchimp: {e}")
+            queue_mailchimp_subscription(user)
 
         jwt_token = user.generate_jwt()
         return JsonResponse({'token': jwt_token, 'user_id': user.id})
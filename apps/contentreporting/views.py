@@ -1,9 +1,11 @@
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from accounts.outbound import queue_admin_email
+from apps.userblocking.visibility import invalidate_hidden_posts
+
 from .models import Post, ReportedContent
 
 
@@ -31,8 +33,9 @@ def report_post(request):
         reason=reason,
         details=details
     )
+    invalidate_hidden_posts(request.user)
 
-    # Send email notification
+    # Queue an email notification to the admin
     subject = f'New Report for Post ID {post_id}'
     message = (f'A new report has been filed.\n\n'
                f'Report ID: {report.id}\n'
@@ -40,8 +43,6 @@ def report_post(request):
                f'Post ID: {post_id}\n'
                f'Reason: {report.get_reason_display()}\n'
                f'Details: {details}')
-    # Add additional email here
-    recipient_list = ['admin@petzzl.app']
-    send_mail(subject, message, 'admin@petzzl.app', recipient_list)
+    queue_admin_email(subject, message, 'admin@petzzl.app')
 
     return Response({'message': 'Your report has been submitted. Thank you for helping us keep our community safe.'})
@@ -0,0 +1,56 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.postcomments.models import PostComment
+from apps.postreactions.models import PostReaction
+
+from .models import Post
+
+
+def _count_subquery(queryset):
+    counts = queryset.order_by().values('post').annotate(
+        count=Count('id')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def actual_like_count():
+    return _count_subquery(PostReaction.objects.filter(
+        post=OuterRef('pk'), reaction_type='like'))
+
+
+def actual_comment_count():
+    return _count_subquery(PostComment.objects.filter(post=OuterRef('pk')))
+
+
+def actual_latest_comment():
+    return Subquery(PostComment.objects.filter(post=OuterRef('pk')).order_by(
+        '-created_at', '-id').values('id')[:1])
+
+
+def refresh_latest_comments(posts):
+    """
+    Point latest_comment of `posts` at their newest comment, after the one it
+    pointed at was deleted.
+    """
+    return posts.update(latest_comment=actual_latest_comment())
+
+
+def reconcile_post_counters(posts):
+    """
+    Recompute like_count and comment_count of `posts` from the reaction and
+    comment tables. Returns the number of posts whose counters had drifted.
+    """
+    drifted_ids = list(posts.annotate(
+        actual_like_count=actual_like_count(),
+        actual_comment_count=actual_comment_count(),
+    ).filter(
+        ~Q(like_count=F('actual_like_count')) |
+        ~Q(comment_count=F('actual_comment_count'))
+    ).values_list('id', flat=True))
+
+    if drifted_ids:
+        Post.objects.filter(id__in=drifted_ids).update(
+            like_count=actual_like_count(),
+            comment_count=actual_comment_count(),
+        )
+    return len(drifted_ids)
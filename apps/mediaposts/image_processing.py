@@ -0,0 +1,244 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from io import BytesIO
+
+import pillow_heif
+import shortuuid
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, features
+
+pillow_heif.register_heif_opener()
+
+
+ALLOWED_IMAGE_TYPES = {'.png', '.jpg', '.jpeg', '.heic'}
+
+# Longest side, in pixels, of the generated variants
+FULL_SIZE = 1200
+SMALL_THUMBNAIL_SIZE = 300
+
+# Encodings a variant can be written in. JPEG is always generated and is what
+# clients get unless they advertise one of the others in their Accept header.
+IMAGE_FORMATS = {
+    'jpeg': {
+        'extension': '.jpg',
+        'mime_type': 'image/jpeg',
+        'save_options': {'format': 'JPEG'},
+    },
+    'webp': {
+        'extension': '.webp',
+        'mime_type': 'image/webp',
+        'save_options': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    },
+    'avif': {
+        'extension': '.avif',
+        'mime_type': 'image/avif',
+        'save_options': {'format': 'AVIF', 'quality': 60},
+    },
+}
+
+# Formats offered to clients, most preferred first
+NEGOTIABLE_IMAGE_FORMATS = ('avif', 'webp')
+
+
+def process_and_upload_images(image_files, pet_profile_id):
+    # HEIC files are decoded directly through the pillow_heif opener, so every
+    # format goes through the same single-decode pipeline
+    media_urls = upload_media_to_digital_ocean(image_files, pet_profile_id)
+    return media_urls
+
+
+############################### Utilities: Uploading to DO ###############################
+
+
+def upload_media_to_digital_ocean(media_files, pet_profile_id):
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    image_formats = get_image_formats()
+
+    # Decode, resize and encode every image, then upload all variants at once
+    rendered_images = render_all_image_variants(
+        [file.read() for file in media_files], image_formats)
+
+    uploads = []
+    for rendered in rendered_images:
+        unique_filename = shortuuid.ShortUUID().random(length=8)
+        file_path = f"{settings.ENV_FOLDER}/media_posts/{pet_profile_id}/{date_str}/{unique_filename}"
+        for image_format in image_formats:
+            full_size_bytes, small_thumbnail_bytes = rendered[image_format]
+            extension = IMAGE_FORMATS[image_format]['extension']
+            uploads.append((f"{file_path}_resized{extension}", full_size_bytes))
+            uploads.append((f"{file_path}_small{extension}", small_thumbnail_bytes))
+
+    urls = iter(upload_all(uploads))
+
+    # Uploads come back in submission order: per image, per format, full
+    # size then thumbnail
+    media_data = []
+    for _ in rendered_images:
+        format_urls = {image_format: {
+            'full_size': next(urls),
+            'thumbnail_small': next(urls),
+        } for image_format in image_formats}
+
+        jpeg_urls = format_urls.pop('jpeg')
+        media_data.append({
+            'media_url': jpeg_urls['full_size'],
+            'thumbnail_small_url': jpeg_urls['thumbnail_small'],
+            'variants': format_urls,
+        })
+    return media_data
+
+
+def get_image_formats():
+    # Skip formats this Pillow build cannot encode
+    return ['jpeg'] + [image_format for image_format in settings.MEDIA_EXTRA_IMAGE_FORMATS
+                       if features.check(image_format)]
+
+
+def accepted_image_formats(request):
+    """
+    Alternative formats the client accepts, most preferred first. Clients list
+    them next to the JSON type, e.g. `Accept: application/json, image/webp`.
+    Formats are ordered by their q value, then by NEGOTIABLE_IMAGE_FORMATS;
+    q=0 refuses a format.
+    """
+    qualities = parse_accept(request.headers.get('Accept', ''))
+    accepted = [image_format for image_format in NEGOTIABLE_IMAGE_FORMATS
+                if qualities.get(IMAGE_FORMATS[image_format]['mime_type'], 0) > 0]
+    return sorted(accepted, key=lambda image_format: -qualities[
+        IMAGE_FORMATS[image_format]['mime_type']])
+
+
+def parse_accept(accept):
+    """
+    Map each media type listed in an Accept header to its q value.
+    """
+    qualities = {}
+    for media_range in accept.split(','):
+        media_type, *params = [part.strip() for part in media_range.split(';')]
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[media_type.lower()] = quality
+    return qualities
+
+
+def upload_all(uploads):
+    """
+    Save (file_path, bytes) pairs to storage concurrently and return their
+    URLs in the same order.
+    """
+    def upload(item):
+        file_path, content = item
+        saved_path = default_storage.save(file_path, ContentFile(content))
+        return default_storage.url(saved_path)
+
+    if len(uploads) <= 1:
+        return [upload(item) for item in uploads]
+
+    max_workers = min(len(uploads), settings.IMAGE_UPLOAD_THREADS)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(upload, uploads))
+
+
+################################ Utilities: Process Pool ################################
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    # Created on first use and shared by every request handled by this process
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Forking a threaded server process can copy held locks into
+            # the workers; forkserver starts them from a clean process
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_PROCESSING_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver'))
+        return _process_pool
+
+
+def reset_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        _process_pool = None
+
+
+def render_all_image_variants(images, image_formats=('jpeg',)):
+    """
+    Run render_image_variants for every image, in worker processes when
+    there is more than one image, preserving order.
+    """
+    render = partial(render_image_variants, image_formats=image_formats)
+    if len(images) <= 1 or settings.IMAGE_PROCESSING_WORKERS <= 1:
+        return [render(image) for image in images]
+
+    try:
+        return list(get_process_pool().map(render, images))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        reset_process_pool()
+        return [render(image) for image in images]
+
+
+def render_image_variants(image_bytes, image_formats=('jpeg',)):
+    """
+    Return {format: (full size bytes, small thumbnail bytes)} for an image.
+    Runs in worker processes, so it only takes and returns plain data.
+
+    The image is decoded once, JPEGs at the smallest DCT scale that still
+    covers the full size variant, and the thumbnail is derived from the
+    full size variant rather than from the original bitmap.
+    """
+    image = Image.open(BytesIO(image_bytes))
+    if image.format == 'JPEG':
+        image.draft('RGB', (FULL_SIZE, FULL_SIZE))
+
+    full_size_image = resize_image(image, FULL_SIZE)
+    image.close()
+    small_thumbnail_image = resize_image(full_size_image, SMALL_THUMBNAIL_SIZE)
+
+    return {image_format: (encode_image(full_size_image, image_format),
+                           encode_image(small_thumbnail_image, image_format))
+            for image_format in image_formats}
+
+
+########################## Utilities: Image Processing ##########################
+
+def resize_image(image, max_size):
+    ratio = max_size / max(image.width, image.height)
+    new_size = (int(image.width * ratio), int(image.height * ratio))
+    # reducing_gap lets Pillow shrink by an integer factor first, which is
+    # much cheaper than running LANCZOS over the full bitmap
+    return image.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def encode_image(image, image_format='jpeg'):
+    buffer = BytesIO()
+    if image.mode in ('RGBA', 'LA', 'P'):  # Add 'P' mode to include palletized images
+        # Convert to RGB mode. Note that this discards transparency information.
+        image = image.convert('RGB')
+    image.save(buffer, **IMAGE_FORMATS[image_format]['save_options'])
+    return buffer.getvalue()
+
+
+def save_and_upload_image(image, file_path, tag):
+    default_storage.save(file_path, ContentFile(encode_image(image)))
+    media_url = default_storage.url(file_path)
+    return {'url': media_url, 'tag': tag}
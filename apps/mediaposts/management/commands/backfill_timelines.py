@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.mediaposts.models import Post, PostStatus
+from apps.mediaposts.timeline import backfill_user_timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Build the materialized feed timeline of every active user from existing posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=settings.FEED_TIMELINE_BACKFILL_SIZE,
+            help='Number of most recent posts to copy into each timeline.')
+
+    def handle(self, *args, **options):
+        # Existing posts are served from timelines from now on rather than
+        # being merged in at read time
+        fanned_out = Post.objects.filter(
+            fanned_out=False, status=PostStatus.READY).update(fanned_out=True)
+        self.stdout.write(f'Marked {fanned_out} posts as fanned out')
+
+        users = User.objects.filter(is_active=True).iterator(chunk_size=500)
+        user_count = 0
+        for user in users:
+            backfill_user_timeline(user, options['limit'])
+            user_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled timelines for {user_count} users'))
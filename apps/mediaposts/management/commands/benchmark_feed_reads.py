@@ -0,0 +1,108 @@
+import statistics
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from apps.mediaposts.models import Post, TimelineBackfill, TimelineEntry
+from apps.mediaposts.pagination import TimelinePagination
+from apps.mediaposts.timeline import trim_timelines
+from apps.petprofiles.models import PetProfile
+
+User = get_user_model()
+
+INSERT_BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Compare feed read latency of the global feed query with the '
+            'materialized timelines at growing numbers of posts. The '
+            'benchmark data is created in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Number of requests per mode and post count.')
+        parser.add_argument(
+            '--post-counts', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='Numbers of posts to measure at, in increasing order.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run_benchmarks(options['post_counts'], options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run_benchmarks(self, post_counts, count):
+        viewer = User.objects.create_user('feed-benchmark-viewer@example.com', None)
+        author = User.objects.create_user('feed-benchmark-author@example.com', None)
+        pet = PetProfile.objects.create(
+            pet_id='feed-benchmark', user=author,
+            pet_name='Benchmark', pet_type='dog')
+
+        client = APIClient(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        client.force_authenticate(viewer)
+
+        # The viewer's timeline is built by fan-outs only
+        TimelineBackfill.objects.create(user=viewer)
+
+        created = 0
+        for post_count in sorted(post_counts):
+            # Grow the data set to post_count posts, each fanned out to the
+            # viewer, whose timeline keeps the newest ones
+            while created < post_count:
+                batch_size = min(INSERT_BATCH_SIZE, post_count - created)
+                posts = Post.objects.bulk_create(
+                    Post(pet=pet, caption='benchmark', fanned_out=True)
+                    for _ in range(batch_size))
+                if posts[0].pk is None:
+                    # Backends that do not return ids from bulk inserts
+                    posts = Post.objects.filter(pet=pet).order_by('-id')[:batch_size]
+                TimelineEntry.objects.bulk_create(
+                    TimelineEntry(user=viewer, post=post, author=author,
+                                  created_at=post.created_at)
+                    for post in posts)
+                trim_timelines([viewer.id])
+                created += batch_size
+
+            deep_page = post_count // 2 // 5 + 1
+            middle = TimelineEntry.objects.filter(user=viewer).order_by(
+                '-created_at', '-post_id').values_list('created_at', 'post_id')[
+                    TimelineEntry.objects.filter(user=viewer).count() // 2]
+            timeline_cursor = TimelinePagination().encode_cursor(*middle)
+
+            modes = (
+                ('global feed, first page', False, '/api/mediaposts/feed/'),
+                ('global feed, middle page', False, f'/api/mediaposts/feed/?page={deep_page}'),
+                ('timeline, first page', True, '/api/mediaposts/feed/?pagination=cursor'),
+                ('timeline, middle page', True,
+                 f'/api/mediaposts/feed/?pagination=cursor&cursor={quote(timeline_cursor)}'),
+            )
+            for label, timeline_enabled, url in modes:
+                with override_settings(FEED_TIMELINE_ENABLED=timeline_enabled):
+                    timings = self.run_requests(client, url, count)
+                self.stdout.write(
+                    f'{post_count} posts, {label}: '
+                    f'median {statistics.median(timings):.2f} ms, '
+                    f'p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms')
+
+    def run_requests(self, client, url, count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+        return timings
@@ -0,0 +1,79 @@
+import os
+import statistics
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, features
+
+from apps.mediaposts.image_processing import (ALLOWED_IMAGE_TYPES, FULL_SIZE, IMAGE_FORMATS,
+                                              SMALL_THUMBNAIL_SIZE, encode_image, resize_image)
+
+from .benchmark_image_processing import make_sample_image
+
+
+class Command(BaseCommand):
+    help = ('Compare the size and the encode and decode latency of the JPEG, '
+            'WebP and AVIF variants over a corpus of images. Nothing is '
+            'uploaded.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            help='Directory of sample images; defaults to generated photos.')
+        parser.add_argument(
+            '--samples', type=int, default=10,
+            help='Number of generated photos when no corpus is given.')
+
+    def handle(self, *args, **options):
+        originals = self.load_corpus(options['corpus'], options['samples'])
+        image_formats = [image_format for image_format in IMAGE_FORMATS
+                         if image_format == 'jpeg' or features.check(image_format)]
+
+        # Resize once per image, as the pipeline does, and only time the
+        # encoding of the variants
+        variants = []
+        for original in originals:
+            full_size_image = resize_image(Image.open(BytesIO(original)), FULL_SIZE)
+            variants.append((full_size_image,
+                             resize_image(full_size_image, SMALL_THUMBNAIL_SIZE)))
+
+        jpeg_bytes = None
+        for image_format in image_formats:
+            total_bytes = 0
+            encode_timings = []
+            decode_timings = []
+            for full_size_image, small_thumbnail_image in variants:
+                for image in (full_size_image, small_thumbnail_image):
+                    start = time.perf_counter()
+                    encoded = encode_image(image, image_format)
+                    encode_timings.append((time.perf_counter() - start) * 1000)
+                    total_bytes += len(encoded)
+
+                    # What a client pays to display the variant
+                    start = time.perf_counter()
+                    Image.open(BytesIO(encoded)).load()
+                    decode_timings.append((time.perf_counter() - start) * 1000)
+
+            if jpeg_bytes is None:
+                jpeg_bytes = total_bytes
+            self.stdout.write(
+                f'{image_format}: {total_bytes / 1024:.0f} KiB '
+                f'({total_bytes / jpeg_bytes:.0%} of jpeg), '
+                f'encode median {statistics.median(encode_timings):.2f} ms, '
+                f'decode median {statistics.median(decode_timings):.2f} ms')
+
+    def load_corpus(self, corpus, samples):
+        if corpus is None:
+            return [make_sample_image((4032, 3024), seed) for seed in range(samples)]
+
+        if not os.path.isdir(corpus):
+            raise CommandError(f'{corpus} is not a directory')
+        originals = []
+        for name in sorted(os.listdir(corpus)):
+            if os.path.splitext(name.lower())[1] in ALLOWED_IMAGE_TYPES:
+                with open(os.path.join(corpus, name), 'rb') as image_file:
+                    originals.append(image_file.read())
+        if not originals:
+            raise CommandError(f'No images in {corpus}')
+        return originals
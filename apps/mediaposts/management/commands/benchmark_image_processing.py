@@ -0,0 +1,82 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from PIL import Image, ImageDraw
+
+from apps.mediaposts.image_processing import get_image_formats, render_all_image_variants
+
+
+def make_sample_image(size, seed):
+    """
+    JPEG bytes of a generated `size` image. Gradients and shapes compress and
+    decode more like a photo than a flat color does.
+    """
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for i in range(50):
+        x, y = (seed * 97 + i * 131) % size[0], (seed * 53 + i * 89) % size[1]
+        draw.ellipse((x, y, x + size[0] // 8, y + size[1] // 8),
+                     fill=((i * 40) % 256, (seed * 60) % 256, (i * 17) % 256))
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = ('Measure the wall-clock time of rendering the variants of a post '
+            'with 1, 4 and 9 images, in the calling process and in the '
+            'worker process pool. Nothing is uploaded.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs', type=int, default=10,
+            help='Number of runs per mode and image count.')
+        parser.add_argument(
+            '--image-counts', type=int, nargs='+', default=[1, 4, 9],
+            help='Numbers of images per post.')
+        parser.add_argument(
+            '--size', type=int, nargs=2, default=[4032, 3024],
+            metavar=('WIDTH', 'HEIGHT'),
+            help='Size of the generated JPEG originals (default: a 12 MP photo).')
+        parser.add_argument(
+            '--workers', type=int, default=settings.IMAGE_PROCESSING_WORKERS,
+            help='Size of the process pool (default: IMAGE_PROCESSING_WORKERS).')
+
+    def handle(self, *args, **options):
+        if options['workers'] <= 1:
+            raise CommandError('Need at least 2 workers to compare with the process pool')
+
+        image_formats = get_image_formats()
+        images = [make_sample_image(options['size'], seed)
+                  for seed in range(max(options['image_counts']))]
+
+        with override_settings(IMAGE_PROCESSING_WORKERS=options['workers']):
+            # Start the workers outside the measurements; requests share a
+            # warm pool
+            start = time.perf_counter()
+            render_all_image_variants(images[:options['workers']], image_formats)
+            self.stdout.write(
+                f'process pool start: {(time.perf_counter() - start) * 1000:.2f} ms')
+
+        for image_count in options['image_counts']:
+            for label, workers in (('in process', 1),
+                                   (f'{options["workers"]} worker processes', options['workers'])):
+                with override_settings(IMAGE_PROCESSING_WORKERS=workers):
+                    timings = self.run_renders(
+                        images[:image_count], image_formats, options['runs'])
+                self.stdout.write(
+                    f'{image_count} images, {label}: '
+                    f'median {statistics.median(timings):.2f} ms, '
+                    f'p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms')
+
+    def run_renders(self, images, image_formats, count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            render_all_image_variants(images, image_formats)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,17 @@
+from apps.mediaposts.media_pipeline import claim_media_jobs, process_media_job
+from petsocialmediabackend.outbox import QueueWorkerCommand
+
+
+class Command(QueueWorkerCommand):
+    help = 'Generate media variants for posts waiting in the media processing queue.'
+    default_batch_size = 5
+    default_poll_interval = 2.0
+    success_message = 'Processed {count} jobs'
+
+    def claim(self, batch_size):
+        return claim_media_jobs(batch_size)
+
+    def process(self, jobs):
+        for job in jobs:
+            process_media_job(job)
+        return len(jobs)
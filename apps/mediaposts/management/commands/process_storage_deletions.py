@@ -0,0 +1,15 @@
+from apps.mediaposts.storage_cleanup import claim_storage_deletions, process_storage_deletions
+from petsocialmediabackend.outbox import QueueWorkerCommand
+from petsocialmediabackend.spaces import DELETE_OBJECTS_BATCH_SIZE
+
+
+class Command(QueueWorkerCommand):
+    help = 'Delete the stored objects queued by post, pet profile and account deletion.'
+    default_batch_size = DELETE_OBJECTS_BATCH_SIZE
+    success_message = 'Deleted {count} objects'
+
+    def claim(self, batch_size):
+        return claim_storage_deletions(batch_size)
+
+    def process(self, deletions):
+        return process_storage_deletions(deletions)
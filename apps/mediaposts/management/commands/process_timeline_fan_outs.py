@@ -0,0 +1,15 @@
+from apps.mediaposts.timeline import claim_fan_outs, process_fan_outs
+from petsocialmediabackend.outbox import QueueWorkerCommand
+
+
+class Command(QueueWorkerCommand):
+    help = "Write newly published posts into their readers' timelines."
+    default_batch_size = 10
+    default_poll_interval = 2.0
+    success_message = 'Fanned out {count} posts'
+
+    def claim(self, batch_size):
+        return claim_fan_outs(batch_size)
+
+    def process(self, fan_outs):
+        return process_fan_outs(fan_outs)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from apps.mediaposts.counters import reconcile_post_counters
+from apps.mediaposts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Repair drifted like_count and comment_count values on posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of posts checked per query.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        repaired = 0
+        last_id = 0
+
+        while True:
+            batch_ids = list(Post.objects.filter(id__gt=last_id).order_by(
+                'id').values_list('id', flat=True)[:batch_size])
+            if not batch_ids:
+                break
+            repaired += reconcile_post_counters(
+                Post.objects.filter(id__in=batch_ids))
+            last_id = batch_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired counters on {repaired} posts'))
@@ -0,0 +1,171 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+import shortuuid
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .image_processing import process_and_upload_images
+from .models import Media, MediaProcessingJob, Post, PostStatus
+from .storage_cleanup import schedule_storage_deletion
+from .timeline import schedule_fan_out
+
+logger = logging.getLogger(__name__)
+
+# With the 'queue' backend, image posts are created in the PROCESSING state
+# with their originals stored as-is; a MediaProcessingJob is left for the
+# process_media_jobs worker command, which generates the variants, creates
+# the Media rows and flips the post to READY. With the 'inline' backend
+# (development and tests) nothing would retry a failed job, so the request
+# processes the uploaded files itself and only creates the post once its
+# media exist.
+
+
+def store_original(image_file, pet_profile_id):
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    unique_filename = shortuuid.ShortUUID().random(length=8)
+    extension = os.path.splitext(image_file.name.lower())[1]
+    file_path = f"{settings.ENV_FOLDER}/media_originals/{pet_profile_id}/{date_str}/{unique_filename}{extension}"
+    return default_storage.save(file_path, image_file)
+
+
+def enqueue_image_post(pet_profile, caption, image_files):
+    """
+    Create an image post from the uploaded `image_files`. Returns None when
+    the images were processed inline and failed.
+    """
+    if settings.MEDIA_PROCESSING_BACKEND == 'inline':
+        try:
+            media_data = process_and_upload_images(image_files, pet_profile.pet_id)
+        except Exception:
+            logger.exception('Processing media for a post by %s failed',
+                             pet_profile.pet_id)
+            return None
+
+        with transaction.atomic():
+            post = Post.objects.create(pet=pet_profile, caption=caption)
+            finish_post(post, media_data)
+        return post
+
+    original_paths = [store_original(image_file, pet_profile.pet_id)
+                      for image_file in image_files]
+
+    with transaction.atomic():
+        post = Post.objects.create(
+            pet=pet_profile, caption=caption, status=PostStatus.PROCESSING)
+        MediaProcessingJob.objects.create(
+            post=post, original_paths=original_paths)
+    return post
+
+
+def claim_media_jobs(limit):
+    """
+    Lock and mark as running up to `limit` jobs that are pending, or that have
+    been running for longer than MEDIA_PROCESSING_STALE_AFTER seconds (their
+    worker most likely died).
+    """
+    now = timezone.now()
+    stale_before = now - \
+        timedelta(seconds=settings.MEDIA_PROCESSING_STALE_AFTER)
+
+    with transaction.atomic():
+        jobs = list(MediaProcessingJob.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            Q(status='pending') | Q(status='running', updated_at__lt=stale_before)
+        ).order_by('updated_at')[:limit])
+
+        MediaProcessingJob.objects.filter(id__in=[job.id for job in jobs]).update(
+            status='running', attempts=F('attempts') + 1, updated_at=now)
+
+    for job in jobs:
+        job.status = 'running'
+        job.attempts += 1
+    return jobs
+
+
+def process_media_job(job):
+    post = Post.objects.select_related('pet').filter(pk=job.post_id).first()
+    if post is None:
+        # The post was deleted while waiting to be processed
+        delete_originals(job.original_paths)
+        return
+
+    try:
+        image_files = [default_storage.open(path)
+                       for path in job.original_paths]
+        try:
+            media_data = process_and_upload_images(image_files, post.pet_id)
+        finally:
+            for image_file in image_files:
+                image_file.close()
+    except Exception as e:
+        logger.exception('Processing media for post %s failed', post.id)
+        record_failure(job, e)
+        return
+
+    with transaction.atomic():
+        post = Post.objects.select_for_update().filter(pk=job.post_id).first()
+        if post is not None:
+            finish_post(post, media_data)
+            job.status = 'done'
+            job.save(update_fields=['status', 'updated_at'])
+        else:
+            # Deleted while its media was being processed
+            schedule_storage_deletion([url for item in media_data
+                                       for url in media_storage_urls(item)])
+
+    delete_originals(job.original_paths)
+
+
+def finish_post(post, media_data):
+    """
+    Create the Media rows of `post` from processed `media_data` and make it
+    READY. Must be called inside a transaction.
+    """
+    for index, item in enumerate(media_data):
+        Media.objects.create(
+            post=post,
+            media_url=item['media_url'],
+            thumbnail_small_url=item['thumbnail_small_url'],
+            variants=item['variants'],
+            media_type='photo',
+            order=index
+        )
+    Post.objects.filter(pk=post.pk).update(status=PostStatus.READY)
+    post.status = PostStatus.READY
+
+    if settings.FEED_TIMELINE_ENABLED:
+        schedule_fan_out(post)
+
+
+def media_storage_urls(item):
+    return Media(media_url=item['media_url'],
+                 thumbnail_small_url=item['thumbnail_small_url'],
+                 variants=item['variants']).get_storage_urls()
+
+
+def record_failure(job, error):
+    job.last_error = str(error)
+    if job.attempts >= settings.MEDIA_PROCESSING_MAX_ATTEMPTS:
+        job.status = 'failed'
+        Post.objects.filter(pk=job.post_id).update(status=PostStatus.FAILED)
+    else:
+        job.status = 'pending'
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+
+    if job.status == 'failed':
+        # Nothing will read them again
+        delete_originals(job.original_paths)
+
+
+def delete_originals(original_paths):
+    for path in original_paths:
+        try:
+            default_storage.delete(path)
+        except Exception:
+            logger.exception('Failed to delete original %s', path)
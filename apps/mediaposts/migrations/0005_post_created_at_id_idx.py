@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaposts', '0004_remove_media_thumbnail_medium_url'),
+        ('petprofiles', '0008_alter_petprofile_pet_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='post_created_at_id_idx'),
+        ),
+    ]
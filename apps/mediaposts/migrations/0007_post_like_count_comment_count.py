@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model('mediaposts', 'Post')
+    PostComment = apps.get_model('postcomments', 'PostComment')
+    PostReaction = apps.get_model('postreactions', 'PostReaction')
+
+    def count_subquery(queryset):
+        counts = queryset.order_by().values('post').annotate(
+            count=Count('id')).values('count')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    Post.objects.update(
+        like_count=count_subquery(PostReaction.objects.filter(
+            post=OuterRef('pk'), reaction_type='like')),
+        comment_count=count_subquery(
+            PostComment.objects.filter(post=OuterRef('pk'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaposts', '0006_timelineentry'),
+        ('postcomments', '0002_alter_postcomment_content'),
+        ('postreactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
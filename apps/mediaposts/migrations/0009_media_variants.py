@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaposts', '0008_mediaprocessingjob_post_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='media',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_latest_comment(apps, schema_editor):
+    Post = apps.get_model('mediaposts', 'Post')
+    PostComment = apps.get_model('postcomments', 'PostComment')
+
+    Post.objects.update(latest_comment=Subquery(
+        PostComment.objects.filter(post=OuterRef('pk')).order_by(
+            '-created_at', '-id').values('id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaposts', '0010_storagedeletion'),
+        ('postcomments', '0003_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='latest_comment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='postcomments.postcomment'),
+        ),
+        migrations.RunPython(populate_latest_comment, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaposts', '0011_post_latest_comment'),
+        ('petprofiles', '0010_pet_name_lower_idx'),
+        ('postcomments', '0003_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['pet', '-created_at', '-id'], name='post_pet_created_idx'),
+        ),
+    ]
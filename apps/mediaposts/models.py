@@ -1,13 +1,57 @@
+from django.contrib.auth import get_user_model
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from apps.petprofiles.models import PetProfile
 
+User = get_user_model()
+
+
+class PostStatus(models.TextChoices):
+    PROCESSING = 'processing', 'Processing'
+    READY = 'ready', 'Ready'
+    FAILED = 'failed', 'Failed'
+
 
 class Post(models.Model):
     pet = models.ForeignKey(PetProfile, on_delete=models.CASCADE)
     caption = models.TextField(blank=True)
+    # Image posts stay in PROCESSING until a worker has generated their media
+    status = models.CharField(
+        max_length=10,
+        choices=PostStatus.choices,
+        default=PostStatus.READY
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # False until the post has been written to every timeline; such posts are
+    # merged into the feed at read time instead
+    fanned_out = models.BooleanField(default=False)
+    # Denormalized so rendering a post does not aggregate reactions/comments;
+    # repaired by the reconcile_post_counters command if they drift
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # The comment previewed under the post, kept by add_comment/delete_comment
+    # so feeds can select_related it instead of querying comments per post
+    latest_comment = models.ForeignKey(
+        'postcomments.PostComment',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            # Backs the feed's keyset pagination on (created_at, id)
+            models.Index(fields=['-created_at', '-id'],
+                         name='post_created_at_id_idx'),
+            models.Index(fields=['fanned_out', '-created_at', '-id'],
+                         name='post_fanned_out_idx'),
+            # Backs a pet's post grid, newest first
+            models.Index(fields=['pet', '-created_at', '-id'],
+                         name='post_pet_created_idx'),
+        ]
 
     def __str__(self):
         return f"Post {self.id} by {self.pet}"
@@ -21,6 +65,9 @@ class Media(models.Model):
                                   ('photo', 'Photo'), ('video', 'Video')])
     media_url = models.URLField(max_length=500)
     thumbnail_small_url = models.URLField(max_length=500, null=True)
+    # Same images in other encodings:
+    # {format: {'full_size': url, 'thumbnail_small': url}}
+    variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     order = models.PositiveIntegerField(default=0)
@@ -31,8 +78,148 @@ class Media(models.Model):
     def __str__(self):
         return f"Media {self.id} of Post {self.post.id}"
 
+    def get_urls(self, image_formats=()):
+        """
+        Return (full size url, thumbnail url) in the first of `image_formats`
+        this media has, falling back to the JPEG variants.
+        """
+        for image_format in image_formats:
+            variant = self.variants.get(image_format)
+            if variant:
+                return variant['full_size'], variant['thumbnail_small']
+        return self.media_url, self.thumbnail_small_url
+
+    def get_storage_urls(self):
+        """
+        URLs of every stored object that belongs to this media.
+        """
+        urls = [self.media_url, self.thumbnail_small_url]
+        for variant in self.variants.values():
+            urls += [variant['full_size'], variant['thumbnail_small']]
+        return [url for url in urls if url]
+
     def save(self, *args, **kwargs):
         if Media.objects.filter(post=self.post, order=self.order).exclude(id=self.id).exists():
             raise ValidationError(
                 f"Media with order {self.order} already exists for this post.")
         super(Media, self).save(*args, **kwargs)
+
+
+class MediaProcessingJob(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    post = models.OneToOneField(Post, related_name='processing_job',
+                                on_delete=models.CASCADE)
+    # Storage paths of the uploaded originals, in display order
+    original_paths = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'],
+                         name='media_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Media processing job {self.id} for Post {self.post_id} ({self.status})"
+
+
+class StorageDeletion(models.Model):
+    # Outbox of stored objects to delete. Rows are written in the same
+    # transaction as the rows that referenced the objects and removed once
+    # the object is gone.
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    )
+
+    url = models.URLField(max_length=500)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Not claimed by a worker before this time (retry backoff and lease)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='storage_deletion_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Storage deletion {self.id} of {self.url} ({self.status})"
+
+
+class TimelineFanOut(models.Model):
+    # Outbox of posts waiting to be written into timelines. Rows are written
+    # in the transaction that makes the post ready and removed once every
+    # timeline has it; until then the post is merged into feeds at read time.
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('failed', 'Failed'),
+    )
+
+    post = models.OneToOneField(Post, related_name='timeline_fan_out',
+                                on_delete=models.CASCADE)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Not claimed by a worker before this time (retry backoff and lease)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='timeline_fan_out_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Timeline fan-out {self.id} of Post {self.post_id} ({self.status})"
+
+
+class TimelineEntry(models.Model):
+    # Materialized home feed: one row per post per user who should see it
+    user = models.ForeignKey(User, related_name='timeline_entries',
+                             on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, related_name='timeline_entries',
+                             on_delete=models.CASCADE)
+    # Copied from the post so the feed can be read without joining it
+    author = models.ForeignKey(User, related_name='+',
+                               on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'],
+                         name='timeline_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in timeline of user {self.user_id}"
+
+
+class TimelineBackfill(models.Model):
+    # Marks a user whose timeline has been filled with the posts published
+    # before they could receive fan-outs; its absence means the next feed read
+    # backfills it
+    user = models.OneToOneField(User, primary_key=True, related_name='timeline_backfill',
+                                on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Timeline of user {self.user_id} backfilled at {self.created_at}"
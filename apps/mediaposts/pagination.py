@@ -0,0 +1,178 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .timeline import get_timeline_page
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    The cursor encodes the direction and the (created_at, id) key of the
+    first or last row served. Each page is an index range scan that starts
+    at that key, so deep pages cost the same as the first one and rows added
+    meanwhile never shift items between pages.
+    """
+    page_size = 20
+    page_size_query_param = None
+    max_page_size = None
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        direction, key = self.decode_cursor(request)
+
+        if direction == 'previous':
+            created_at, row_id = key
+            rows = list(queryset.filter(created_at__gte=created_at).exclude(
+                created_at=created_at, id__lte=row_id
+            ).order_by('created_at', 'id')[:page_size + 1])
+            self.has_previous = len(rows) > page_size
+            self.has_next = True
+            rows = rows[:page_size][::-1]
+        else:
+            if key is not None:
+                created_at, row_id = key
+                queryset = queryset.filter(created_at__lte=created_at).exclude(
+                    created_at=created_at, id__gte=row_id)
+            rows = list(queryset.order_by(
+                '-created_at', '-id')[:page_size + 1])
+            self.has_next = len(rows) > page_size
+            self.has_previous = key is not None
+            rows = rows[:page_size]
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+                if page_size > 0:
+                    return min(page_size, self.max_page_size or page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.get_link('next', self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Walked past the end; the first page is the way back
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.get_link('previous', self.page[0])
+
+    def get_link(self, direction, row):
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(direction, row.created_at, row.id))
+
+    def encode_cursor(self, direction, created_at, row_id):
+        raw = f'{direction}|{created_at.isoformat()}|{row_id}'
+        return b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return 'next', None
+
+        try:
+            direction, created_at, row_id = b64decode(
+                encoded.encode('ascii')).decode('ascii').split('|')
+            if direction not in ('next', 'previous'):
+                raise ValueError(direction)
+            return direction, (datetime.fromisoformat(created_at), int(row_id))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class FeedCursorPagination(KeysetPagination):
+    """
+    Keyset pagination over the feed, backed by post_created_at_id_idx.
+    """
+    page_size = 5
+
+
+class PetPostGridPagination(KeysetPagination):
+    """
+    Keyset pagination over a pet's posts, sized for the profile grid and
+    backed by post_pet_created_idx.
+    """
+    page_size = 24
+    max_page_size = 99
+    page_size_query_param = 'page_size'
+
+
+class TimelinePagination(BasePagination):
+    """
+    Keyset pagination over a user's materialized timeline.
+
+    The cursor encodes the (created_at, post_id) key of the last post served,
+    and each page is read with get_timeline_page.
+    """
+    page_size = 5
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_timeline(self, request):
+        self.request = request
+        self.before = self.decode_cursor(request)
+
+        keys = get_timeline_page(request.user, self.before, self.page_size)
+        self.has_next = len(keys) > self.page_size
+        keys = keys[:self.page_size]
+        self.last_key = keys[-1] if keys else None
+
+        return [post_id for _, post_id in keys]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        created_at, post_id = self.last_key
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(created_at, post_id))
+
+    def encode_cursor(self, created_at, post_id):
+        raw = f'{created_at.isoformat()}|{post_id}'
+        return b64encode(raw.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            created_at, post_id = b64decode(
+                encoded.encode('ascii')).decode('ascii').split('|')
+            return datetime.fromisoformat(created_at), int(post_id)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
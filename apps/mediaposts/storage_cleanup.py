@@ -0,0 +1,112 @@
+import logging
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from petsocialmediabackend.outbox import claim_due, record_failure
+from petsocialmediabackend.spaces import DELETE_OBJECTS_BATCH_SIZE, delete_objects_by_url
+
+from .models import Media, MediaProcessingJob, StorageDeletion
+
+logger = logging.getLogger(__name__)
+
+# Deleting a post, pet profile or account queues the URLs of its stored
+# objects as StorageDeletion rows inside the same transaction as the row
+# deletes, so no remote call is made while locks are held and nothing is lost
+# if the request dies. With the 'queue' backend they are left for the
+# process_storage_deletions worker command; with 'inline' (development and
+# tests) the request deletes the objects it queued once its transaction
+# commits.
+
+
+def get_media_storage_urls(posts):
+    """
+    URLs of every stored object belonging to the media of `posts` (a list or
+    queryset of posts), including the originals of posts still waiting to be
+    processed.
+    """
+    urls = []
+    media_items = Media.objects.filter(post__in=posts).only(
+        'media_url', 'thumbnail_small_url', 'variants')
+    for media in media_items:
+        urls += media.get_storage_urls()
+
+    jobs = MediaProcessingJob.objects.filter(
+        post__in=posts, status__in=['pending', 'running']
+    ).values_list('original_paths', flat=True)
+    for original_paths in jobs:
+        urls += [default_storage.url(path) for path in original_paths]
+    return urls
+
+
+def schedule_storage_deletion(urls):
+    """
+    Queue the objects behind `urls` for deletion. Must be called inside the
+    transaction that deletes the rows referencing them.
+    """
+    urls = [url for url in urls if url]
+    if not urls:
+        return
+
+    StorageDeletion.objects.bulk_create(
+        [StorageDeletion(url=url) for url in urls],
+        batch_size=DELETE_OBJECTS_BATCH_SIZE)
+
+    if settings.STORAGE_CLEANUP_BACKEND == 'inline':
+        transaction.on_commit(lambda: drain_storage_deletions(urls))
+
+
+def claim_storage_deletions(limit=DELETE_OBJECTS_BATCH_SIZE, urls=None):
+    deletions = StorageDeletion.objects.all()
+    if urls is not None:
+        # Only the objects the caller queued, not whatever else is due
+        deletions = deletions.filter(url__in=urls)
+    return claim_due(deletions, limit, settings.STORAGE_CLEANUP_LEASE)
+
+
+def process_storage_deletions(deletions):
+    """
+    Delete the objects of the claimed `deletions` with batched DeleteObjects
+    requests and return how many were deleted.
+    """
+    if not deletions:
+        return 0
+
+    failures = dict(delete_objects_by_url(
+        [deletion.url for deletion in deletions]))
+
+    deleted_ids = [deletion.id for deletion in deletions
+                   if deletion.url not in failures]
+    StorageDeletion.objects.filter(id__in=deleted_ids).delete()
+
+    now = timezone.now()
+    for deletion in deletions:
+        if deletion.url in failures:
+            record_deletion_failure(deletion, failures[deletion.url], now)
+
+    return len(deleted_ids)
+
+
+def drain_storage_deletions(urls):
+    """
+    Delete the queued objects behind `urls` now. Returns the number deleted.
+    """
+    deleted = 0
+    try:
+        for start in range(0, len(urls), DELETE_OBJECTS_BATCH_SIZE):
+            batch = urls[start:start + DELETE_OBJECTS_BATCH_SIZE]
+            deleted += process_storage_deletions(
+                claim_storage_deletions(len(batch), urls=batch))
+    except Exception:
+        # The deletions stay queued and are retried once their lease expires
+        logger.exception('Draining storage deletions failed')
+    return deleted
+
+
+def record_deletion_failure(deletion, error, now):
+    if record_failure(deletion, error, settings.STORAGE_CLEANUP_MAX_ATTEMPTS,
+                      settings.STORAGE_CLEANUP_RETRY_DELAY, now):
+        logger.error('Giving up deleting %s after %s attempts: %s',
+                     deletion.url, deletion.attempts, error)
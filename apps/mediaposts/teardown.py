@@ -0,0 +1,66 @@
+from apps.petprofiles.caching import invalidate_pet_profiles
+from apps.petprofiles.models import PetProfile
+from apps.postcomments.models import PostComment
+from apps.postreactions.caching import invalidate_post_reactions
+from apps.postreactions.models import PostReaction
+
+from .counters import reconcile_post_counters, refresh_latest_comments
+from .models import Post
+
+# Deleting a queryset lets Django's collector cascade to dependent tables with
+# one DELETE ... WHERE post_id IN (...) per table, instead of the per-post
+# SELECT/DELETE round trips of calling post.delete() in a loop. Posts are
+# deleted in chunks to bound the size of each statement and its lock set.
+
+TEARDOWN_BATCH_SIZE = 500
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), TEARDOWN_BATCH_SIZE):
+        yield ids[start:start + TEARDOWN_BATCH_SIZE]
+
+
+def delete_posts_in_bulk(posts):
+    """
+    Delete `posts` (a queryset) together with their media, comments,
+    reactions, reports and timeline entries. Returns the number of posts
+    deleted.
+    """
+    post_ids = list(posts.order_by().values_list('id', flat=True))
+    for chunk in _chunks(post_ids):
+        Post.objects.filter(id__in=chunk).delete()
+    invalidate_post_reactions(post_ids)
+    return len(post_ids)
+
+
+def delete_pet_profiles_in_bulk(pet_profiles):
+    """
+    Delete `pet_profiles` (a queryset), their posts, and the comments and
+    likes they left on other posts, keeping the counters of those posts
+    correct.
+    """
+    owners = dict(pet_profiles.order_by().values_list('pet_id', 'user_id'))
+    pet_ids = list(owners)
+    if not pet_ids:
+        return
+
+    delete_posts_in_bulk(Post.objects.filter(pet_id__in=pet_ids))
+
+    # What is left of their activity is on other pets' posts
+    comments = PostComment.objects.filter(pet_profile_id__in=pet_ids)
+    reactions = PostReaction.objects.filter(pet_profile_id__in=pet_ids)
+    affected_post_ids = set(comments.values_list('post_id', flat=True)) | \
+        set(reactions.values_list('post_id', flat=True))
+    comments.delete()
+    reactions.delete()
+
+    PetProfile.objects.filter(pet_id__in=pet_ids).delete()
+
+    for chunk in _chunks(sorted(affected_post_ids)):
+        reconcile_post_counters(Post.objects.filter(id__in=chunk))
+        # Deleting a previewed comment cleared the post's pointer to it
+        refresh_latest_comments(Post.objects.filter(
+            id__in=chunk, latest_comment__isnull=True))
+
+    invalidate_pet_profiles(pet_ids, owners.values())
+    invalidate_post_reactions(affected_post_ids)
@@ -1,3 +1,255 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import boto3
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from moto import mock_aws
+from rest_framework.test import APIClient
+
+from apps.mediaposts.image_processing import accepted_image_formats
+from apps.mediaposts.models import Media, Post, TimelineEntry
+from apps.mediaposts.timeline import fan_out_post
+from apps.petprofiles.models import PetProfile
+from apps.postcomments.models import PostComment
+from petsocialmediabackend.spaces import delete_objects_by_url
+
+User = get_user_model()
+
+# Visibility sets are not cached in process-local memory, which keeps the
+# query counts below independent of earlier requests
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_user(email):
+    return User.objects.create_user(email, 'password', first_name='Test', last_name='User')
+
+
+def create_post(pet, media_count=1, commenter=None, comment_count=0):
+    post = Post.objects.create(pet=pet, caption=f'Post by {pet.pet_id}')
+    for order in range(media_count):
+        Media.objects.create(
+            post=post,
+            media_type='photo',
+            media_url=f'https://example.com/{post.id}_{order}.jpg',
+            thumbnail_small_url=f'https://example.com/{post.id}_{order}_small.jpg',
+            order=order
+        )
+    for index in range(comment_count):
+        comment = PostComment.objects.create(
+            post=post, pet_profile=commenter, content=f'Comment {index}')
+        Post.objects.filter(pk=post.pk).update(
+            comment_count=index + 1, latest_comment=comment)
+    return post
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class FeedQueryCountTests(TestCase):
+    # Hidden posts, hidden users (blocked and blocked by), page count, posts
+    # with their author and latest comment, and media
+    FEED_PAGE_QUERIES = 6
+
+    def setUp(self):
+        self.user = create_user('viewer@example.com')
+        author = create_user('author@example.com')
+        self.pet = PetProfile.objects.create(
+            pet_id='author_pet', user=author, pet_name='Author', pet_type='dog')
+        commenter = PetProfile.objects.create(
+            pet_id='viewer_pet', user=self.user, pet_name='Viewer', pet_type='cat')
+
+        for index in range(12):
+            create_post(self.pet, media_count=index % 4 + 1,
+                        commenter=commenter, comment_count=index % 3)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assert_page_queries(self, page):
+        with self.assertNumQueries(self.FEED_PAGE_QUERIES):
+            response = self.client.get('/api/mediaposts/feed/', {'page': page})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_feed_pages_cost_the_same_at_every_page_size(self):
+        for page_size in (2, 5, 10):
+            with self.subTest(page_size=page_size), \
+                    mock.patch('apps.mediaposts.views.fetch_feed_views.FEED_PAGE_SIZE', page_size):
+                first_page = self.assert_page_queries(1)
+                second_page = self.assert_page_queries(2)
+                self.assertEqual(len(first_page), page_size)
+                self.assertEqual(len(second_page), min(page_size, 12 - page_size))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class FeedCursorPaginationTests(TestCase):
+    def setUp(self):
+        user = create_user('viewer@example.com')
+        self.pet = PetProfile.objects.create(
+            pet_id='author_pet', user=create_user('author@example.com'),
+            pet_name='Author', pet_type='dog')
+        self.posts = [create_post(self.pet) for _ in range(12)]
+        # Posts sharing a timestamp across page boundaries must still be
+        # served exactly once
+        Post.objects.filter(id__in=[post.id for post in self.posts[3:9]]).update(
+            created_at=self.posts[3].created_at)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_scroll_serves_every_post_once_while_new_posts_arrive(self):
+        seen = []
+        url = '/api/mediaposts/feed/?pagination=cursor'
+        while url:
+            response = self.client.get(url).json()
+            seen += [post['post_id'] for post in response['results']]
+            url = response['next']
+            create_post(self.pet)
+
+        expected = sorted(self.posts, key=lambda post: (
+            Post.objects.get(pk=post.pk).created_at, post.id), reverse=True)
+        self.assertEqual(seen, [post.id for post in expected])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PetPostsQueryCountTests(TestCase):
+    # Pet profile, hidden users (blocked and blocked by), hidden posts, and
+    # posts with their media counts and covers
+    PET_POSTS_QUERIES = 5
+
+    def setUp(self):
+        viewer = create_user('viewer@example.com')
+        self.pet = PetProfile.objects.create(
+            pet_id='author_pet', user=create_user('author@example.com'),
+            pet_name='Author', pet_type='dog')
+
+        self.client = APIClient()
+        self.client.force_authenticate(viewer)
+
+    def assert_pet_posts_queries(self, params=None):
+        with self.assertNumQueries(self.PET_POSTS_QUERIES):
+            response = self.client.get('/api/mediaposts/pet_posts/author_pet/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pet_posts_cost_the_same_for_any_number_of_posts(self):
+        for post_count in (1, 4, 12):
+            while Post.objects.filter(pet=self.pet).count() < post_count:
+                create_post(self.pet, media_count=post_count % 4 + 1)
+
+            with self.subTest(post_count=post_count):
+                posts = self.assert_pet_posts_queries()
+                self.assertEqual(len(posts), post_count)
+
+                page = self.assert_pet_posts_queries(
+                    {'pagination': 'cursor', 'page_size': 5})
+                self.assertEqual(len(page['results']), min(post_count, 5))
+
+
+
+@override_settings(CACHES=LOCAL_CACHES, FEED_TIMELINE_ENABLED=True)
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.pet = PetProfile.objects.create(
+            pet_id='author_pet', user=create_user('author@example.com'),
+            pet_name='Author', pet_type='dog')
+
+    def publish(self):
+        post = create_post(self.pet)
+        fan_out_post(post)
+        return post
+
+    def read_feed(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        seen = []
+        url = '/api/mediaposts/feed/?pagination=cursor'
+        while url:
+            response = client.get(url).json()
+            seen += [post['post_id'] for post in response['results']]
+            url = response['next']
+        return seen
+
+    def test_new_user_is_backfilled_after_receiving_a_fan_out(self):
+        older_posts = [self.publish() for _ in range(8)]
+        viewer = create_user('viewer@example.com')
+        newest_post = self.publish()
+
+        self.assertEqual(self.read_feed(viewer), [
+            post.id for post in reversed(older_posts + [newest_post])])
+        # Backfilled once, not on every read
+        with mock.patch('apps.mediaposts.views.fetch_feed_views.backfill_user_timeline') as backfill:
+            self.read_feed(viewer)
+        backfill.assert_not_called()
+
+    @override_settings(FEED_TIMELINE_BACKFILL_SIZE=3)
+    def test_fan_out_caps_timelines(self):
+        viewer = create_user('viewer@example.com')
+        posts = [self.publish() for _ in range(5)]
+
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=viewer).order_by(
+                '-created_at', '-post_id').values_list('post_id', flat=True)),
+            [post.id for post in reversed(posts[2:])])
+
+
+
+class AcceptedImageFormatsTests(SimpleTestCase):
+    def accepted(self, accept=None):
+        headers = {} if accept is None else {'HTTP_ACCEPT': accept}
+        return accepted_image_formats(RequestFactory().get('/', **headers))
+
+    def test_missing_header_accepts_no_alternative_formats(self):
+        self.assertEqual(self.accepted(), [])
+
+    def test_formats_are_ordered_by_quality_then_preference(self):
+        self.assertEqual(self.accepted('application/json, image/webp, image/avif'),
+                         ['avif', 'webp'])
+        self.assertEqual(self.accepted('image/avif;q=0.5, image/webp'),
+                         ['webp', 'avif'])
+
+    def test_q_zero_refuses_a_format(self):
+        self.assertEqual(self.accepted('image/webp;q=0, image/avif'), ['avif'])
+        self.assertEqual(self.accepted('image/webp; q=0.0'), [])
+
+    def test_types_must_match_exactly(self):
+        self.assertEqual(self.accepted('image/webpx, application/image/avif'), [])
+
+
+@mock_aws
+@override_settings(AWS_S3_ENDPOINT_URL=None, AWS_S3_REGION_NAME='us-east-1',
+                   AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing')
+class SpacesClientTests(TestCase):
+    BUCKET = 'petzzl'
+
+    def setUp(self):
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket=self.BUCKET)
+        self.s3 = s3
+
+    def put_objects(self, prefix, count):
+        urls = []
+        for index in range(count):
+            key = f'media_posts/{prefix}/{index}.jpg'
+            self.s3.put_object(Bucket=self.BUCKET, Key=key, Body=b'image')
+            urls.append(f'https://s3.amazonaws.com/{self.BUCKET}/{key}')
+        return urls
+
+    def test_deletes_share_one_client(self):
+        # More keys than fit in one DeleteObjects request, so every call
+        # sends batches from several threads
+        url_sets = [self.put_objects(f'post_{index}', 25) for index in range(4)]
+
+        with mock.patch('petsocialmediabackend.spaces._client', None), \
+                mock.patch('petsocialmediabackend.spaces.DELETE_OBJECTS_BATCH_SIZE', 10), \
+                mock.patch.object(boto3.session.Session, 'client', autospec=True,
+                                  side_effect=boto3.session.Session.client) as create_client:
+            # Repeated
+            self.assertEqual(delete_objects_by_url(url_sets[0]), [])
+            self.assertEqual(delete_objects_by_url(url_sets[1]), [])
+            # Concurrent
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                failures = list(executor.map(delete_objects_by_url, url_sets[2:]))
+
+        self.assertEqual(failures, [[], []])
+        self.assertEqual(create_client.call_count, 1)
+        self.assertEqual(self.s3.list_objects_v2(Bucket=self.BUCKET)['KeyCount'], 0)
@@ -0,0 +1,194 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from apps.userblocking.visibility import get_hidden_post_ids, get_hidden_user_ids
+from petsocialmediabackend.outbox import claim_due, record_failure
+
+from .models import Post, PostStatus, TimelineBackfill, TimelineEntry, TimelineFanOut
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+FAN_OUT_BATCH_SIZE = 1000
+
+# Fanning a post out writes a row per active user, so it is not done in the
+# request that publishes the post. The post is queued as a TimelineFanOut row
+# for the process_timeline_fan_outs worker command (with the 'inline'
+# backend, used in development and tests, the request fans it out once its
+# transaction commits); until then get_timeline_page merges it in at read
+# time like any other post that was not fanned out.
+
+
+def schedule_fan_out(post):
+    """
+    Queue `post` for fan-out. Must be called inside the transaction that
+    makes the post READY.
+    """
+    fan_out = TimelineFanOut.objects.create(post=post)
+    if settings.FEED_FANOUT_BACKEND == 'inline':
+        transaction.on_commit(lambda: process_fan_outs(claim_due(
+            TimelineFanOut.objects.filter(pk=fan_out.pk), 1,
+            settings.FEED_FANOUT_LEASE)))
+
+
+def claim_fan_outs(limit):
+    return claim_due(TimelineFanOut.objects.all(), limit,
+                     settings.FEED_FANOUT_LEASE)
+
+
+def process_fan_outs(fan_outs):
+    """
+    Fan out the posts of the claimed `fan_outs` and return how many were
+    fanned out.
+    """
+    done = 0
+    for fan_out in fan_outs:
+        try:
+            fan_out_post(Post.objects.select_related(
+                'pet__user').get(pk=fan_out.post_id))
+        except Exception as e:
+            logger.exception('Fanning out post %s failed', fan_out.post_id)
+            if record_failure(fan_out, str(e), settings.FEED_FANOUT_MAX_ATTEMPTS,
+                              settings.FEED_FANOUT_RETRY_DELAY):
+                logger.error('Giving up fanning out post %s after %s attempts',
+                             fan_out.post_id, fan_out.attempts)
+            continue
+        fan_out.delete()
+        done += 1
+    return done
+
+
+def is_heavy_poster(user_id):
+    """
+    Posters above the daily limit are not fanned out; their posts are merged
+    into feeds at read time instead of being copied into every timeline.
+    """
+    since = timezone.now() - timedelta(days=1)
+    recent_post_count = Post.objects.filter(
+        pet__user_id=user_id, created_at__gte=since).count()
+    return recent_post_count > settings.FEED_FANOUT_MAX_DAILY_POSTS
+
+
+def fan_out_post(post):
+    """
+    Write `post` into the timeline of every active user who can see it.
+    """
+    author_id = post.pet.user_id
+    if is_heavy_poster(author_id):
+        return
+
+    hidden_user_ids = get_hidden_user_ids(post.pet.user)
+    recipient_ids = User.objects.filter(
+        is_active=True
+    ).values_list('id', flat=True).iterator(chunk_size=FAN_OUT_BATCH_SIZE)
+
+    with transaction.atomic():
+        batch = []
+        for user_id in recipient_ids:
+            if user_id in hidden_user_ids:
+                continue
+            batch.append(TimelineEntry(user_id=user_id, post=post,
+                                       author_id=author_id,
+                                       created_at=post.created_at))
+            if len(batch) >= FAN_OUT_BATCH_SIZE:
+                TimelineEntry.objects.bulk_create(
+                    batch, ignore_conflicts=True)
+                trim_timelines([entry.user_id for entry in batch])
+                batch = []
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        trim_timelines([entry.user_id for entry in batch])
+
+        Post.objects.filter(pk=post.pk).update(fanned_out=True)
+
+
+def backfill_user_timeline(user, limit=None):
+    """
+    Fill `user`'s timeline with the most recent fanned-out posts and mark it
+    as backfilled.
+    """
+    limit = limit or settings.FEED_TIMELINE_BACKFILL_SIZE
+    hidden_user_ids = get_hidden_user_ids(user)
+    posts = Post.objects.filter(
+        fanned_out=True, status=PostStatus.READY
+    ).exclude(
+        pet__user_id__in=hidden_user_ids
+    ).order_by('-created_at', '-id').values_list(
+        'id', 'pet__user_id', 'created_at')[:limit]
+
+    with transaction.atomic():
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user=user, post_id=post_id, author_id=author_id,
+                          created_at=created_at)
+            for post_id, author_id, created_at in posts
+        ], batch_size=FAN_OUT_BATCH_SIZE, ignore_conflicts=True)
+        trim_timelines([user.id])
+        # Concurrent first reads may both backfill; the entries are the same
+        TimelineBackfill.objects.bulk_create(
+            [TimelineBackfill(user=user)], ignore_conflicts=True)
+
+
+def needs_backfill(user):
+    return not TimelineBackfill.objects.filter(user=user).exists()
+
+
+def trim_timelines(user_ids, size=None):
+    """
+    Drop the entries of the given users' timelines past their `size` newest,
+    FEED_TIMELINE_BACKFILL_SIZE by default.
+    """
+    if not user_ids:
+        return
+    size = size or settings.FEED_TIMELINE_BACKFILL_SIZE
+    overflow = TimelineEntry.objects.filter(user_id__in=user_ids).annotate(
+        position=Window(RowNumber(), partition_by=F('user_id'),
+                        order_by=(F('created_at').desc(), F('post_id').desc()))
+    ).filter(position__gt=size).values_list('id', flat=True)
+    # Materialized first: MySQL cannot delete from a table it selects from
+    TimelineEntry.objects.filter(id__in=list(overflow)).delete()
+
+
+def get_timeline_page(user, before=None, page_size=5):
+    """
+    Return up to `page_size` + 1 (created_at, post_id) keys of `user`'s feed
+    older than the `before` key, newest first.
+
+    Both sources are index range scans: the user's own timeline rows and the
+    (usually tiny) set of posts that were not fanned out.
+    """
+    hidden_post_ids = get_hidden_post_ids(user)
+    hidden_user_ids = get_hidden_user_ids(user)
+
+    entries = TimelineEntry.objects.filter(user=user).exclude(
+        post_id__in=hidden_post_ids
+    ).exclude(
+        author_id__in=hidden_user_ids
+    )
+    unfanned_posts = Post.objects.filter(
+        fanned_out=False, status=PostStatus.READY
+    ).exclude(
+        id__in=hidden_post_ids
+    ).exclude(
+        pet__user_id__in=hidden_user_ids
+    )
+
+    if before is not None:
+        created_at, post_id = before
+        entries = entries.filter(created_at__lte=created_at).exclude(
+            created_at=created_at, post_id__gte=post_id)
+        unfanned_posts = unfanned_posts.filter(created_at__lte=created_at).exclude(
+            created_at=created_at, id__gte=post_id)
+
+    keys = list(entries.order_by('-created_at', '-post_id').values_list(
+        'created_at', 'post_id')[:page_size + 1])
+    keys += unfanned_posts.order_by('-created_at', '-id').values_list(
+        'created_at', 'id')[:page_size + 1]
+
+    return sorted(set(keys), reverse=True)[:page_size + 1]
@@ -1,28 +1,27 @@
 import os
 import tempfile
 from datetime import datetime
-from io import BytesIO
 
 import cv2
-import pillow_heif
 import shortuuid
 from django.conf import settings
 from django.core.files.storage import default_storage
-from django.core.files.uploadedfile import InMemoryUploadedFile
+from django.db import transaction
 from django.http import JsonResponse
 from PIL import Image
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 
-from apps.mediaposts.models import Media, PetProfile, Post
+from apps.mediaposts.image_processing import (ALLOWED_IMAGE_TYPES,
+                                              resize_image,
+                                              save_and_upload_image)
+from apps.mediaposts.media_pipeline import enqueue_image_post
+from apps.mediaposts.models import Media, PetProfile, Post, PostStatus
+from apps.mediaposts.timeline import schedule_fan_out
 
 # TODO: refactor this file
 
 
-pillow_heif.register_heif_opener()
-
-
-ALLOWED_IMAGE_TYPES = {'.png', '.jpg', '.jpeg', '.heic'}
 ALLOWED_VIDEO_TYPES = {'.mp4', '.mov'}
 
 MAX_IMAGES_PER_POST = 9
@@ -58,22 +57,33 @@ def create_post_view(request):
         # All files are images
         if len(image_files) > MAX_IMAGES_PER_POST:
             return JsonResponse({'error': f'Cannot upload more than {MAX_IMAGES_PER_POST} images in a single post'}, status=400)
-        media_urls = process_and_upload_images(image_files, pet_profile.pet_id)
+
+        # Images are resized and uploaded by the media pipeline, which may
+        # finish after this request has returned
+        post = enqueue_image_post(
+            pet_profile, request.data.get('caption'), image_files)
+        if post is None:
+            return JsonResponse({'error': 'Failed to process media'}, status=500)
+        if post.status == PostStatus.PROCESSING:
+            return JsonResponse({
+                'message': 'Post is being processed',
+                'post_id': post.id,
+                'status': post.status
+            }, status=202)
     elif len(video_files) == 1 and len(media_files) == 1:
         # Exactly one file, which is a video
         # Assume this function exists
         media_urls = process_and_upload_videos(video_files, pet_profile.pet_id)
+        if isinstance(media_urls, JsonResponse):
+            return media_urls
+
+        # Create post and associated media records
+        post = create_post_and_media(
+            pet_profile, request.data.get('caption'), media_urls)
     else:
         # Invalid combination of files
         return JsonResponse({'error': 'You can either upload up to 9 images or 1 video'}, status=400)
 
-    if isinstance(media_urls, JsonResponse):
-        return media_urls
-
-    # Create post and associated media records
-    post = create_post_and_media(
-        pet_profile, request.data.get('caption'), media_urls)
-
     first_media = post.media.first()
     media_url = first_media.media_url if first_media else None
     thumbnail_small_url = first_media.thumbnail_small_url if first_media else None
@@ -86,23 +96,6 @@ def create_post_view(request):
     }, status=201)
 
 
-def process_and_upload_images(image_files, pet_profile_id):
-    converted_media_files = []
-
-    # Convert HEIC to JPEG and process images
-    for image_file in image_files:
-        if os.path.splitext(image_file.name.lower())[1] == '.heic':
-            image = Image.open(image_file)
-            image_file = convert_image_to_jpeg(image, image_file.name)
-
-        converted_media_files.append(image_file)
-
-    # Upload processed images
-    media_urls = upload_media_to_digital_ocean(
-        converted_media_files, pet_profile_id)
-    return media_urls
-
-
 def process_and_upload_videos(video_files, pet_profile_id):
     media_data = []  # This will store dictionaries for each video file
     date_str = datetime.now().strftime('%Y-%m-%d')
@@ -149,6 +142,7 @@ def process_and_upload_videos(video_files, pet_profile_id):
     return media_data
 
 
+@transaction.atomic
 def create_post_and_media(pet_profile, caption, media_data):
     post = Post.objects.create(pet=pet_profile, caption=caption)
     for index, item in enumerate(media_data):
@@ -159,77 +153,11 @@ def create_post_and_media(pet_profile, caption, media_data):
             media_type=determine_media_type(item['media_url']),
             order=index
         )
-    return post
-
-############################### Utilities: Uploading to DO ###############################
-
-
-def upload_media_to_digital_ocean(media_files, pet_profile_id):
-    media_data = []  # This will store dictionaries for each media file
-    date_str = datetime.now().strftime('%Y-%m-%d')
-
-    for file in media_files:
-        unique_filename = shortuuid.ShortUUID().random(length=8)
-        file_extension_with_dot = '.jpg'
-        new_filename = f"{unique_filename}{file_extension_with_dot}"
-        file_path = f"{settings.ENV_FOLDER}/media_posts/{pet_profile_id}/{date_str}/{new_filename}"
-
-        if file_extension_with_dot in ALLOWED_IMAGE_TYPES:
-            image = Image.open(file)
-
-            # Resize and upload original size
-            resized_image = resize_image(image, 1200)
-            resized_path = file_path.replace(
-                new_filename, f"{unique_filename}_resized{file_extension_with_dot}")
-            resized_image_info = save_and_upload_image(
-                resized_image, resized_path, 'full_size')
-
-            # Resize and upload small thumbnail
-            small_thumbnail = resize_image(image, 300)
-            small_path = file_path.replace(
-                new_filename, f"{unique_filename}_small{file_extension_with_dot}")
-            small_thumbnail_info = save_and_upload_image(
-                small_thumbnail, small_path, 'thumbnail_small')
-
-            media_item = {
-                'media_url': resized_image_info['url'],
-                'thumbnail_small_url': small_thumbnail_info['url']
-            }
-            media_data.append(media_item)
-
-        else:
-            return JsonResponse({'error': f'Unsupported file type: {file_extension_with_dot}'}, status=400)
-
-    return media_data
-
-
-########################## Utilities: Image Processing ##########################
-
-def resize_image(image, max_size):
-    ratio = max_size / max(image.width, image.height)
-    new_size = (int(image.width * ratio), int(image.height * ratio))
-    return image.resize(new_size, Image.Resampling.LANCZOS)
-
-
-def convert_image_to_jpeg(image, filename):
-    buffer = BytesIO()
-    new_filename = filename.rsplit('.', 1)[0] + '.jpg'
-    image.convert('RGB').save(buffer, 'JPEG')
-    buffer.seek(0)
-    return InMemoryUploadedFile(buffer, 'ImageField', new_filename, 'image/jpeg', buffer.tell(), None)
-
-
-def save_and_upload_image(image, file_path, tag):
-    buffer = BytesIO()
-    if image.mode in ('RGBA', 'LA', 'P'):  # Add 'P' mode to include palletized images
-        # Convert to RGB mode. Note that this discards transparency information.
-        image = image.convert('RGB')
-    image.save(buffer, format='JPEG')
-    buffer.seek(0)
-    default_storage.save(file_path, buffer)
-    media_url = default_storage.url(file_path)
-    return {'url': media_url, 'tag': tag}
 
+    # Queue the post to be copied into users' timelines
+    if settings.FEED_TIMELINE_ENABLED:
+        schedule_fan_out(post)
+    return post
 
 ########################## Utilities: Video Processing ##########################
 
@@ -1,65 +1,116 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 
-from apps.contentreporting.models import ReportedContent
-from apps.mediaposts.models import Post
-from apps.userblocking.models import BlockedUser
+from apps.mediaposts.image_processing import accepted_image_formats
+from apps.mediaposts.models import Post, PostStatus
+from apps.mediaposts.pagination import FeedCursorPagination, TimelinePagination
+from apps.mediaposts.timeline import backfill_user_timeline, needs_backfill
+from apps.postreactions.likes import annotate_liked
+from apps.userblocking.visibility import get_hidden_post_ids, get_hidden_user_ids
 
 # TODO: Enhance feed content
 
+FEED_PAGE_SIZE = 5
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_feed(request):
-    paginator = PageNumberPagination()
-    paginator.page_size = 5
-
-    # Fetch IDs of users who have blocked the current user
-    blocked_by_others_ids = BlockedUser.objects.filter(
-        blocked=request.user
-    ).values_list('blocker_id', flat=True)
-
-    # Fetch IDs of users who are blocked by the current user
-    blocked_by_user_ids = BlockedUser.objects.filter(
-        blocker=request.user
-    ).values_list('blocked_id', flat=True)
-
-    # Combine both lists of IDs
-    all_blocked_users_ids = set(
-        list(blocked_by_others_ids) + list(blocked_by_user_ids))
-
-    # Fetch IDs of posts reported by the current user
-    reported_posts_ids = ReportedContent.objects.filter(
-        reporter=request.user
-    ).values_list('reported_post_id', flat=True)
+    # ?pagination=cursor switches to keyset pagination for infinite scroll
+    if request.query_params.get('pagination') == 'cursor':
+        if settings.FEED_TIMELINE_ENABLED:
+            return get_timeline_feed(request)
+        paginator = FeedCursorPagination()
+    else:
+        paginator = PageNumberPagination()
+        paginator.page_size = FEED_PAGE_SIZE
 
     # Fetch all posts, excluding those reported by the user and those from blocked users
-    all_posts = Post.objects.exclude(
-        id__in=reported_posts_ids
+    all_posts = Post.objects.filter(
+        status=PostStatus.READY
+    ).exclude(
+        id__in=get_hidden_post_ids(request.user)
     ).exclude(
-        pet__user_id__in=all_blocked_users_ids
-    ).order_by('-created_at')
+        pet__user_id__in=get_hidden_user_ids(request.user)
+    ).order_by('-created_at', '-id')
+
+    # Load the author and media together with the page itself
+    all_posts = with_like_status(with_feed_relations(all_posts), request)
 
     # Apply pagination to the queryset
     paginated_posts = paginator.paginate_queryset(all_posts, request)
 
     # Convert posts to the response format
-    feed = [convert_post_to_response_format(post) for post in paginated_posts]
+    feed = convert_posts_to_response_format(
+        paginated_posts, accepted_image_formats(request))
+
+    response = paginator.get_paginated_response(feed)
+    # Media URLs depend on the image formats the client accepts
+    patch_vary_headers(response, ['Accept'])
+    return response
+
 
-    return paginator.get_paginated_response(feed)
+def get_timeline_feed(request):
+    paginator = TimelinePagination()
+    post_ids = paginator.paginate_timeline(request)
 
+    # A timeline only receives posts fanned out after its user was created;
+    # fill in the older ones on the user's first read
+    if paginator.before is None and needs_backfill(request.user):
+        backfill_user_timeline(request.user)
+        post_ids = paginator.paginate_timeline(request)
 
-def convert_post_to_response_format(post):
+    posts = with_like_status(with_feed_relations(
+        Post.objects.filter(id__in=post_ids)), request)
+    posts_by_id = {post.id: post for post in posts}
+    page = [posts_by_id[post_id] for post_id in post_ids
+            if post_id in posts_by_id]
+
+    response = paginator.get_paginated_response(
+        convert_posts_to_response_format(page, accepted_image_formats(request)))
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def with_feed_relations(posts):
+    """
+    Attach everything convert_post_to_response_format reads to the queryset,
+    so serializing a page does not issue queries per post.
+    """
+    return posts.select_related(
+        'pet', 'latest_comment__pet_profile').prefetch_related('media')
+
+
+def with_like_status(posts, request):
+    """
+    ?pet_profile_id=<pet_id> embeds like_count and whether that pet liked
+    each post, saving the client a like status request per post.
+    """
+    pet_profile_id = request.query_params.get('pet_profile_id')
+    if pet_profile_id:
+        posts = annotate_liked(posts, request.user, pet_profile_id)
+    return posts
+
+
+def convert_posts_to_response_format(posts, image_formats=()):
+    return [convert_post_to_response_format(post, post.latest_comment, image_formats)
+            for post in posts]
+
+
+def convert_post_to_response_format(post, latest_comment, image_formats=()):
     media_data = []
     for media in post.media.all():
+        full_size_url, thumbnail_url = media.get_urls(image_formats)
         media_info = {
             'media_id': media.id,
-            'full_size_url': media.media_url,
+            'full_size_url': full_size_url,
             'media_type': media.media_type,
         }
-        if media.media_type == 'video' and media.thumbnail_small_url:
-            media_info['thumbnail_url'] = media.thumbnail_small_url
+        if media.media_type == 'video' and thumbnail_url:
+            media_info['thumbnail_url'] = thumbnail_url
         media_data.append(media_info)
 
     pet_profile_pic_url = post.pet.profile_pic_thumbnail_small
@@ -67,8 +118,6 @@ def convert_post_to_response_format(post):
     pet_type = post.pet.pet_type
     created_at_str = post.created_at.strftime('%Y-%m-%d')
 
-    # Fetching the latest comment for the post
-    latest_comment = post.comments.order_by('-created_at').first()
     if latest_comment:
         latest_comment_data = {
             'comment_id': latest_comment.id,
@@ -79,10 +128,7 @@ def convert_post_to_response_format(post):
     else:
         latest_comment_data = None
 
-    # Fetching the total comment count for the post
-    comment_count = post.comments.count()
-
-    return {
+    post_data = {
         'post_id': post.id,
         'caption': post.caption,
         'media': media_data,
@@ -91,5 +137,10 @@ def convert_post_to_response_format(post):
         'pet_type': pet_type,
         'posted_date': created_at_str,
         'latest_comment': latest_comment_data,
-        'comment_count': comment_count
+        'comment_count': post.comment_count
     }
+    # Annotated by with_like_status
+    if hasattr(post, 'liked'):
+        post_data['like_count'] = post.like_count
+        post_data['liked'] = post.liked
+    return post_data
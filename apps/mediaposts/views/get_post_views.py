@@ -1,38 +1,42 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.contentreporting.models import ReportedContent
-from apps.mediaposts.models import PetProfile, Post
-from apps.userblocking.models import BlockedUser
+from apps.mediaposts.image_processing import accepted_image_formats
+from apps.mediaposts.models import Media, PetProfile, Post, PostStatus
+from apps.mediaposts.pagination import PetPostGridPagination
+from apps.userblocking.visibility import annotate_visibility, get_hidden_post_ids, is_blocked_between
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_post_media(request, post_id, detail_level='overview'):
-    post = get_object_or_404(Post, pk=post_id)
     user = request.user
+    post = get_object_or_404(annotate_visibility(Post.objects.select_related(
+        'pet', 'latest_comment__pet_profile'), user), pk=post_id)
 
-    if ReportedContent.objects.filter(reporter=user, reported_post=post).exists() or \
-       post.pet.user.id in set(BlockedUser.objects.filter(blocker=user).values_list('blocked', flat=True)) or \
-       post.pet.user.id in set(BlockedUser.objects.filter(blocked=user).values_list('blocker', flat=True)):
+    if post.blocked or post.reported:
         return Response({'message': 'Access denied'}, status=403)
 
     media_data = []
     created_at_str = post.created_at.strftime('%Y-%m-%d %H:%M:%S')
 
     if detail_level == 'full':
+        image_formats = accepted_image_formats(request)
         for media in post.media.all():
+            full_size_url, thumbnail_url = media.get_urls(image_formats)
             media_data.append({
                 'media_id': media.id,
                 'media_type': media.media_type,
-                'full_size_url': media.media_url,
-                'thumbnail_url': media.thumbnail_small_url,
+                'full_size_url': full_size_url,
+                'thumbnail_url': thumbnail_url,
             })
 
-    # Fetch the latest comment for the post
-    latest_comment_instance = post.comments.order_by('-created_at').first()
+    latest_comment_instance = post.latest_comment
     if latest_comment_instance:
         latest_comment = {
             "comment_id": latest_comment_instance.id,
@@ -43,18 +47,20 @@ def get_post_media(request, post_id, detail_level='overview'):
     else:
         latest_comment = None
 
-    comment_count = post.comments.count()
-
     response_data = {
         'post_id': post.id,
         'caption': post.caption,
         'media': media_data,
         'posted_date': created_at_str,
+        'status': post.status,
         'latest_comment': latest_comment,  # Add latest comment details here
-        'comment_count': comment_count  # Add comment count here
+        'comment_count': post.comment_count  # Add comment count here
     }
 
-    return Response(response_data)
+    response = Response(response_data)
+    # Media URLs depend on the image formats the client accepts
+    patch_vary_headers(response, ['Accept'])
+    return response
 
 
 @api_view(['GET'])
@@ -68,42 +74,52 @@ def get_pet_posts(request, pet_id):
 
     user = request.user
 
-    # Fetch IDs of posts reported by the current user
-    reported_posts_ids = ReportedContent.objects.filter(
-        reporter=user
-    ).values_list('reported_post_id', flat=True)
-
-    # Fetch sets of users who have been blocked or have blocked the current user
-    blocked_users = set(BlockedUser.objects.filter(
-        blocker=user).values_list('blocked', flat=True))
-    users_blocking = set(BlockedUser.objects.filter(
-        blocked=user).values_list('blocker', flat=True))
-
-    # Combine the sets to check if there is a block in either direction
-    if pet.user.id in blocked_users or pet.user.id in users_blocking:
-        # No posts should be shown if the user is blocked or is blocking
+    # No posts should be shown if the user is blocked or is blocking
+    if is_blocked_between(user, pet.user_id):
         return Response([])
 
     # Fetch all posts for a given pet profile, excluding reported and posts from blocked users
     pet_posts = Post.objects.filter(
-        pet_id=pet_id
+        pet_id=pet_id, status=PostStatus.READY
     ).exclude(
-        id__in=reported_posts_ids
-    ).order_by('-created_at')
-
-    response_data = []
-    for post in pet_posts:
-        media_count = post.media.count()
-        first_media = post.media.first()  # Get the first media item
-        if first_media:
-            post_type = 'video' if first_media.media_type == 'video' else 'photo'
-            post_data = {
-                'post_id': post.id,
-                'caption': post.caption,
-                'thumbnail_url': first_media.thumbnail_small_url,
-                'has_multiple_images': media_count > 1,
-                'post_type': post_type
-            }
-            response_data.append(post_data)
-
-    return Response(response_data)
+        id__in=get_hidden_post_ids(user)
+    ).order_by('-created_at', '-id')
+
+    # Media counts and covers come from subqueries on the posts query
+    pet_posts = with_grid_cover(pet_posts).filter(media_count__gt=0)
+
+    # ?pagination=cursor pages through the grid instead of listing every post
+    if request.query_params.get('pagination') == 'cursor':
+        paginator = PetPostGridPagination()
+        page = paginator.paginate_queryset(pet_posts, request)
+        return paginator.get_paginated_response(
+            [convert_post_to_grid_format(post) for post in page])
+
+    return Response([convert_post_to_grid_format(post) for post in pet_posts])
+
+
+def with_grid_cover(posts):
+    """
+    Annotate `posts` with media_count and the thumbnail and type of their
+    first media, so a grid page is one query however many posts it shows.
+    """
+    media = Media.objects.filter(post=OuterRef('pk'))
+    first_media = media.order_by('order', 'id')
+    media_count = media.order_by().values('post').annotate(
+        count=Count('id')).values('count')
+
+    return posts.annotate(
+        media_count=Coalesce(Subquery(media_count, output_field=IntegerField()), 0),
+        cover_thumbnail_url=Subquery(first_media.values('thumbnail_small_url')[:1]),
+        cover_media_type=Subquery(first_media.values('media_type')[:1]),
+    )
+
+
+def convert_post_to_grid_format(post):
+    return {
+        'post_id': post.id,
+        'caption': post.caption,
+        'thumbnail_url': post.cover_thumbnail_url,
+        'has_multiple_images': post.media_count > 1,
+        'post_type': 'video' if post.cover_media_type == 'video' else 'photo'
+    }
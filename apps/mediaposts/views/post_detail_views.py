@@ -0,0 +1,120 @@
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from apps.mediaposts.image_processing import accepted_image_formats
+from apps.mediaposts.models import Post
+from apps.postcomments.pagination import CommentKeysetPagination
+from apps.postcomments.views import convert_comment_to_response_format, visible_comments
+from apps.postreactions.likes import annotate_liked
+from apps.postreactions.views import get_visible_likers
+from apps.userblocking.visibility import annotate_visibility
+
+# Everything the app shows on an opened post, in the order it renders it.
+# ?include=media,comments narrows the response to the listed sections.
+POST_DETAIL_SECTIONS = ('author', 'media', 'likes', 'likers', 'comments')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_post_detail(request, post_id):
+    """
+    A post with its author, media, like count and status, likers and first
+    page of comments, replacing one request per section. Each section costs at
+    most one query, and the visibility checks run once for all of them.
+    """
+    include = request.query_params.get('include')
+    if include is None:
+        sections = set(POST_DETAIL_SECTIONS)
+    else:
+        sections = {section for section in include.split(',') if section}
+        unknown = sections.difference(POST_DETAIL_SECTIONS)
+        if unknown:
+            return Response({'message': f"Unknown include: {', '.join(sorted(unknown))}. "
+                                        f"Choose from {', '.join(POST_DETAIL_SECTIONS)}"},
+                            status=400)
+
+    user = request.user
+    posts = annotate_visibility(Post.objects.select_related('pet'), user)
+    if 'media' in sections:
+        posts = posts.prefetch_related('media')
+    pet_profile_id = request.query_params.get('pet_profile_id')
+    if 'likes' in sections and pet_profile_id:
+        posts = annotate_liked(posts, user, pet_profile_id)
+    post = get_object_or_404(posts, pk=post_id)
+
+    if post.blocked or post.reported:
+        return Response({'message': 'Access denied'}, status=403)
+
+    response_data = {
+        'post_id': post.id,
+        'caption': post.caption,
+        'posted_date': post.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'status': post.status,
+        'comment_count': post.comment_count,
+    }
+
+    if 'author' in sections:
+        response_data['author'] = {
+            'pet_id': post.pet.pet_id,
+            'pet_name': post.pet.pet_name,
+            'pet_type': post.pet.pet_type,
+            'profile_pic_thumbnail_small': post.pet.profile_pic_thumbnail_small,
+        }
+
+    if 'media' in sections:
+        image_formats = accepted_image_formats(request)
+        response_data['media'] = []
+        for media in post.media.all():
+            full_size_url, thumbnail_url = media.get_urls(image_formats)
+            response_data['media'].append({
+                'media_id': media.id,
+                'media_type': media.media_type,
+                'full_size_url': full_size_url,
+                'thumbnail_url': thumbnail_url,
+            })
+
+    if 'likes' in sections:
+        response_data['like_count'] = post.like_count
+        # Only known when ?pet_profile_id says which pet is looking
+        if hasattr(post, 'liked'):
+            response_data['liked'] = post.liked
+
+    if 'likers' in sections:
+        response_data['likers'] = get_visible_likers(post.id, user)
+
+    if 'comments' in sections:
+        response_data['comments'] = get_first_comments_page(request, post.id)
+
+    response = Response(response_data)
+    # Media URLs depend on the image formats the client accepts
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def get_first_comments_page(request, post_id):
+    """
+    The newest page of visible comments, with a link to the next page on the
+    comments endpoint.
+    """
+    paginator = CommentKeysetPagination()
+    comments = list(visible_comments(post_id, request.user).order_by(
+        '-created_at', '-id')[:paginator.page_size + 1])
+    page = comments[:paginator.page_size]
+
+    next_link = None
+    if len(comments) > paginator.page_size:
+        next_link = replace_query_param(
+            request.build_absolute_uri(
+                reverse('view_comments_for_post', args=[post_id])),
+            paginator.cursor_query_param,
+            paginator.encode_cursor('next', page[-1].created_at, page[-1].id))
+
+    return {
+        'results': [convert_comment_to_response_format(comment) for comment in page],
+        'next': next_link,
+    }
@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from django.db import transaction
+
+# Response data of the public pet profile endpoints, cached per pet profile
+# and per user. Every view that creates, edits or deletes a pet profile calls
+# invalidate_pet_profiles so the next read is fresh; PUBLIC_CACHE_TIMEOUT
+# only bounds how long a missed invalidation could be served.
+# pet_ids are stored lowercase, so keys are built from the lowercased id.
+
+PET_PROFILE_KEY = 'petprofiles:detail:{pet_id}'
+PETS_BY_USER_KEY = 'petprofiles:by_user:{user_id}'
+PET_ID_TAKEN_KEY = 'petprofiles:pet_id_taken:{pet_id}'
+
+
+def pet_profile_key(pet_id):
+    return PET_PROFILE_KEY.format(pet_id=pet_id.lower())
+
+
+def pets_by_user_key(user_id):
+    return PETS_BY_USER_KEY.format(user_id=user_id)
+
+
+def pet_id_taken_key(pet_id):
+    return PET_ID_TAKEN_KEY.format(pet_id=pet_id.lower())
+
+
+def invalidate_pet_profiles(pet_ids, user_ids):
+    """
+    Drop the cached detail, uniqueness and per-user list entries of the
+    given pet profiles and their owners once the current transaction
+    commits, so a concurrent read cannot cache the old data again.
+    """
+    keys = [pet_profile_key(pet_id) for pet_id in pet_ids]
+    keys += [pet_id_taken_key(pet_id) for pet_id in pet_ids]
+    keys += [pets_by_user_key(user_id) for user_id in set(user_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
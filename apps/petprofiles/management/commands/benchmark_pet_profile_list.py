@@ -0,0 +1,91 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.petprofiles.models import PetProfile
+from apps.petprofiles.serializers import PetProfileSerializer
+
+User = get_user_model()
+
+INSERT_BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Compare the response size and time of serializing every pet '
+            'profile, as the listing used to, with the first and a later '
+            'page of the cursor-paginated listing. The benchmark data is '
+            'created in a transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=20,
+            help='Number of requests per mode.')
+        parser.add_argument(
+            '--profiles', type=int, default=100000,
+            help='Number of pet profiles to create.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run_benchmarks(options['profiles'], options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run_benchmarks(self, profile_count, count):
+        owners = User.objects.bulk_create(
+            User(email=f'pet-list-benchmark-{i}@example.com', password='!')
+            for i in range(100))
+        pet_types = [pet_type for pet_type, _ in PetProfile.PET_TYPE_CHOICES]
+        for start in range(0, profile_count, INSERT_BATCH_SIZE):
+            PetProfile.objects.bulk_create(
+                PetProfile(pet_id=f'pet-list-benchmark-{i}', user=owners[i % len(owners)],
+                           pet_name=f'Benchmark {i}', pet_type=pet_types[i % len(pet_types)])
+                for i in range(start, min(start + INSERT_BATCH_SIZE, profile_count)))
+
+        client = APIClient(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        client.force_authenticate(owners[0])
+
+        def unpaginated():
+            return JSONRenderer().render(
+                PetProfileSerializer(PetProfile.objects.all(), many=True).data)
+
+        def get(url):
+            def request():
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+                return response.content
+            return request
+
+        first_page_url = '/api/petprofiles/pet_profiles/'
+        second_page_url = client.get(first_page_url).json()['next']
+
+        for label, fetch in (('every profile, unpaginated', unpaginated),
+                             ('first page', get(first_page_url)),
+                             ('second page', get(second_page_url)),
+                             ('first page, pet_type filter',
+                              get(f'{first_page_url}?pet_type=cat'))):
+            timings, size = self.run_requests(fetch, count)
+            self.stdout.write(
+                f'{profile_count} profiles, {label}: {size / 1024:.1f} KiB, '
+                f'median {statistics.median(timings):.2f} ms, '
+                f'p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms')
+
+    def run_requests(self, fetch, count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            content = fetch()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings, len(content)
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petprofiles', '0008_alter_petprofile_pet_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='petprofile',
+            index=models.Index(fields=['created_at', 'pet_id'], name='pet_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='petprofile',
+            index=models.Index(fields=['pet_type', 'created_at', 'pet_id'], name='pet_type_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:21
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('petprofiles', '0009_pet_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='petprofile',
+            index=models.Index(django.db.models.functions.text.Lower('pet_name'), models.F('pet_id'), name='pet_name_lower_idx'),
+        ),
+    ]
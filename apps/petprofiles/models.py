@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.core.validators import (MaxLengthValidator, MinLengthValidator,
                                     RegexValidator)
 from django.db import models
+from django.db.models.functions import Lower
 
 User = get_user_model()
 
@@ -77,3 +78,13 @@ class PetProfile(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Back the keyset-paginated profile list, unfiltered and by type
+            models.Index(fields=['created_at', 'pet_id'],
+                         name='pet_created_at_idx'),
+            models.Index(fields=['pet_type', 'created_at', 'pet_id'],
+                         name='pet_type_created_at_idx'),
+            # Backs prefix search on names; pet_id prefixes use the primary key
+            models.Index(Lower('pet_name'), 'pet_id',
+                         name='pet_name_lower_idx'),
+        ]
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PetProfileCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, pet_id), oldest profiles first.
+
+    Each page is an index range scan starting after the last profile of the
+    previous page, optionally narrowed by the pet_type/user filters.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('created_at', 'pet_id')
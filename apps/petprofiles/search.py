@@ -0,0 +1,50 @@
+import re
+
+from django.db.models.functions import Lower
+
+from .models import PetProfile
+
+# Pet search is a prefix search: every lookup is a LIKE 'x%' query, which
+# MySQL runs as an index range scan instead of the table scan of a
+# LIKE '%x%', so its cost depends on the number of matches returned, not on
+# the number of profiles. The range follows the column's collation, which a
+# hand-built (lower <= column < upper) range on code points would not.
+# pet_ids are stored lowercase and scanned on the primary key; names are
+# scanned on the Lower(pet_name) expression index.
+
+SEARCH_RESULTS_LIMIT = 10
+SEARCH_RESULTS_MAX_LIMIT = 25
+
+# Characters pet_ids and pet names may contain; other queries cannot match
+SEARCHABLE_QUERY_RE = re.compile(r'^[a-z0-9 -]+$')
+
+
+def normalize_search_query(query):
+    # Names are saved with single spaces between words
+    return ' '.join(query.split()).lower()
+
+
+def search_pet_profiles(query, limit=SEARCH_RESULTS_LIMIT, hidden_user_ids=()):
+    """
+    Pet profiles matching the normalized `query`, best matches first: the pet
+    whose pet_id is the query, then pet_id prefix matches, then name prefix
+    matches, each group in alphabetical order.
+    """
+    if not SEARCHABLE_QUERY_RE.match(query):
+        return []
+
+    pets = PetProfile.objects.exclude(user_id__in=hidden_user_ids)
+
+    by_pet_id = list(pets.filter(
+        pet_id__istartswith=query
+    ).order_by('pet_id')[:limit])
+
+    by_name = list(pets.annotate(
+        pet_name_lower=Lower('pet_name')
+    ).filter(
+        pet_name_lower__istartswith=query
+    ).order_by('pet_name_lower', 'pet_id')[:limit])
+
+    # by_pet_id is sorted, so an exact match is its first entry
+    results = {pet.pet_id: pet for pet in by_pet_id + by_name}
+    return list(results.values())[:limit]
@@ -13,3 +13,12 @@ class PetProfileSerializer(serializers.ModelSerializer):
                   'created_at',
                   'updated_at')
         read_only_fields = ('user', 'created_at', 'updated_at')
+
+
+class PetProfileListSerializer(serializers.ModelSerializer):
+    # Only what a list row shows; the full profile comes from the detail view
+    class Meta:
+        model = PetProfile
+        fields = ('pet_id', 'user', 'pet_name', 'pet_type',
+                  'profile_pic_thumbnail_small')
+        read_only_fields = fields
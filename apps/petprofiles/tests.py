@@ -1,3 +1,32 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import PetProfile
+
+User = get_user_model()
+
+
+class PetProfileListQueryCountTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            'owner@example.com', 'password', first_name='Test', last_name='User')
+        PetProfile.objects.bulk_create(
+            PetProfile(pet_id=f'pet-{index:02}', user=user,
+                       pet_name=f'Pet {index}', pet_type='dog')
+            for index in range(12))
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_every_page_is_one_query(self):
+        seen = []
+        url = '/api/petprofiles/pet_profiles/?page_size=5'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [pet['pet_id'] for pet in response.json()['results']]
+            url = response.json()['next']
+
+        self.assertEqual(sorted(seen), [f'pet-{index:02}' for index in range(12)])
@@ -6,6 +6,7 @@ urlpatterns = [
          views.get_pets_by_user, name='get_pets_by_user'),
     path('pet_profiles/', views.pet_profile_list_create,
          name='pet_profile_list_create'),
+    path('pet_profiles/search/', views.search_pets, name='search_pets'),
     path('pet_profiles/<str:pet_id>/delete/',
          views.delete_pet_profile, name='delete_pet_profile'),
     path('upload_pet_profile_pic/', views.upload_profile_pic,
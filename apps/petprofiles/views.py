@@ -1,10 +1,9 @@
 import os
 from io import BytesIO
-from urllib.parse import urlparse
 
-import boto3
 import shortuuid
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
@@ -17,10 +16,16 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from apps.mediaposts.models import Post
-from apps.mediaposts.views.delete_post_views import delete_media_from_digital_ocean
+from apps.mediaposts.storage_cleanup import get_media_storage_urls, schedule_storage_deletion
+from apps.mediaposts.teardown import delete_pet_profiles_in_bulk
+from apps.userblocking.visibility import get_hidden_user_ids
+from petsocialmediabackend.spaces import get_spaces_client, parse_spaces_url
 
+from .caching import invalidate_pet_profiles, pet_id_taken_key, pet_profile_key, pets_by_user_key
 from .models import PetProfile
-from .serializers import PetProfileSerializer
+from .pagination import PetProfileCursorPagination
+from .search import SEARCH_RESULTS_LIMIT, SEARCH_RESULTS_MAX_LIMIT, normalize_search_query, search_pet_profiles
+from .serializers import PetProfileListSerializer, PetProfileSerializer
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
@@ -34,14 +39,32 @@ def allowed_file(filename):
 @permission_classes([IsAuthenticated])
 def pet_profile_list_create(request):
     if request.method == 'GET':
-        pets = PetProfile.objects.all()
-        serializer = PetProfileSerializer(pets, many=True)
-        return Response(serializer.data)
+        # created_at is what the cursor orders and paginates on
+        pets = PetProfile.objects.only(
+            *PetProfileListSerializer.Meta.fields, 'created_at')
+
+        pet_type = request.query_params.get('pet_type')
+        if pet_type is not None:
+            if pet_type not in dict(PetProfile.PET_TYPE_CHOICES):
+                return Response({'error': 'Invalid pet_type'}, status=status.HTTP_400_BAD_REQUEST)
+            pets = pets.filter(pet_type=pet_type)
+
+        user_id = request.query_params.get('user')
+        if user_id is not None:
+            if not user_id.isdigit():
+                return Response({'error': 'Invalid user'}, status=status.HTTP_400_BAD_REQUEST)
+            pets = pets.filter(user_id=user_id)
+
+        paginator = PetProfileCursorPagination()
+        page = paginator.paginate_queryset(pets, request)
+        serializer = PetProfileListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     elif request.method == 'POST':
         serializer = PetProfileSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            pet_profile = serializer.save(user=request.user)
+            invalidate_pet_profiles([pet_profile.pet_id], [request.user.id])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -49,11 +72,15 @@ def pet_profile_list_create(request):
 @api_view(['GET', 'PUT'])
 @permission_classes([AllowAny])
 def pet_profile_detail(request, pet_id):
-    pet_profile = get_object_or_404(PetProfile, pet_id=pet_id)
-
     if request.method == 'GET':
-        serializer = PetProfileSerializer(pet_profile)
-        return Response(serializer.data)
+        data = cache.get_or_set(
+            pet_profile_key(pet_id),
+            lambda: PetProfileSerializer(
+                get_object_or_404(PetProfile, pet_id=pet_id)).data,
+            settings.PUBLIC_CACHE_TIMEOUT)
+        return Response(data)
+
+    pet_profile = get_object_or_404(PetProfile, pet_id=pet_id)
 
     if request.user and request.user.is_authenticated:
         if request.method == 'PUT':
@@ -62,6 +89,8 @@ def pet_profile_detail(request, pet_id):
                     pet_profile, data=request.data, partial=True)
                 if serializer.is_valid():
                     serializer.save()
+                    invalidate_pet_profiles(
+                        [pet_profile.pet_id], [pet_profile.user_id])
                     return Response(serializer.data)
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             else:
@@ -86,23 +115,16 @@ def delete_pet_profile(request, pet_id):
         return Response({'error': 'Pet profile not found or not authorized to delete'}, status=404)
 
     with transaction.atomic():
-        # Delete profile pictures from Digital Ocean
-        if pet_profile.profile_pic_regular:
-            delete_media_from_digital_ocean(pet_profile.profile_pic_regular)
-        if pet_profile.profile_pic_thumbnail_small:
-            delete_media_from_digital_ocean(
-                pet_profile.profile_pic_thumbnail_small)
-
-        # Delete all related media posts
+        # Queue profile pictures and all post media for deletion from
+        # Digital Ocean
         posts = Post.objects.filter(pet=pet_profile)
-        for post in posts:
-            for media in post.media.all():
-                delete_media_from_digital_ocean(media.media_url)
-                delete_media_from_digital_ocean(media.thumbnail_small_url)
-            post.delete()
+        storage_urls = [url for url in (pet_profile.profile_pic_regular,
+                                        pet_profile.profile_pic_thumbnail_small) if url]
+        storage_urls += get_media_storage_urls(posts)
+        schedule_storage_deletion(storage_urls)
 
-        # Now that all related media files are deleted, we can delete the pet profile
-        pet_profile.delete()
+        # Delete the pet profile, its posts and everything attached to them
+        delete_pet_profiles_in_bulk(PetProfile.objects.filter(pk=pet_profile.pk))
 
     return Response({'message': 'Pet profile and related media have been deleted successfully'}, status=200)
 
@@ -111,15 +133,40 @@ def delete_pet_profile(request, pet_id):
 @permission_classes([AllowAny])
 def get_pets_by_user(request, user_id):
     try:
-        pets = PetProfile.objects.filter(user_id=user_id)
-        if not pets.exists():
-            return Response([], status=status.HTTP_200_OK)
-
-        serializer = PetProfileSerializer(pets, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = cache.get_or_set(
+            pets_by_user_key(user_id),
+            lambda: PetProfileSerializer(
+                PetProfile.objects.filter(user_id=user_id), many=True).data,
+            settings.PUBLIC_CACHE_TIMEOUT)
+        return Response(data, status=status.HTTP_200_OK)
     except ObjectDoesNotExist:
         return Response({"message": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
+############################## Pet Search ##############################
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_pets(request):
+    query = normalize_search_query(request.query_params.get('q', ''))
+    if not query:
+        return Response({'error': 'q parameter not provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        limit = min(int(request.query_params.get('limit', SEARCH_RESULTS_LIMIT)),
+                    SEARCH_RESULTS_MAX_LIMIT)
+    except ValueError:
+        return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Hide pets of users blocked by or blocking the current user
+    hidden_user_ids = get_hidden_user_ids(request.user) \
+        if request.user.is_authenticated else ()
+
+    pets = search_pet_profiles(query, max(limit, 1), hidden_user_ids)
+    serializer = PetProfileListSerializer(pets, many=True)
+    return Response({'results': serializer.data}, status=status.HTTP_200_OK)
+
+
 ############################## Pet ID Uniqueness Check ##############################
 
 
@@ -128,8 +175,12 @@ def get_pets_by_user(request, user_id):
 # Add pet_id as an argument to the view
 def check_pet_id_uniqueness(request, pet_id):
     if pet_id:
-        is_unique = not PetProfile.objects.filter(pet_id=pet_id).exists()
-        return Response({'is_unique': is_unique})
+        # pet_ids are stored lowercase
+        is_taken = cache.get_or_set(
+            pet_id_taken_key(pet_id),
+            lambda: PetProfile.objects.filter(pet_id=pet_id.lower()).exists(),
+            settings.PUBLIC_CACHE_TIMEOUT)
+        return Response({'is_unique': not is_taken})
     else:
         return Response({'error': 'pet_id parameter not provided'}, status=400)
 
@@ -189,14 +240,7 @@ def upload_profile_pic(request):
         #  TODO: Add checks making sure user is the owner
         pet_id = request.data.get('pet_id', None)
 
-        # Initialize boto3 client for Digital Ocean
-        session = boto3.session.Session()
-        client = session.client('s3',
-                                region_name='sfo3',
-                                endpoint_url='https://sfo3.digitaloceanspaces.com',
-                                aws_access_key_id=os.getenv(
-                                    'AWS_ACCESS_KEY_ID'),
-                                aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
+        client = get_spaces_client()
 
         # If pet profile has existing images, delete them first.
         pet_profile = PetProfile.objects.get(pet_id=pet_id)
@@ -218,6 +262,7 @@ def upload_profile_pic(request):
         pet_profile.profile_pic_regular = regular_url
         pet_profile.profile_pic_thumbnail_small = thumbnail_url
         pet_profile.save()
+        invalidate_pet_profiles([pet_profile.pet_id], [pet_profile.user_id])
 
         return Response({'regular_url': regular_url, 'thumbnail_url': thumbnail_url})
 
@@ -225,10 +270,7 @@ def upload_profile_pic(request):
 
 
 def delete_image_from_do_space(session, url):
-    parsed_url = urlparse(url)
-    path_parts = parsed_url.path.lstrip('/').split('/')
-    bucket_name = path_parts[0]
-    object_name = '/'.join(path_parts[1:])
+    bucket_name, object_name = parse_spaces_url(url)
 
     try:
         session.delete_object(Bucket=bucket_name, Key=object_name)
@@ -252,13 +294,7 @@ def delete_profile_picture(request):
     if pet_profile.user != request.user:
         return Response({'error': "You don't have permission to delete this pet profile picture"}, status=403)
 
-    # Initialize boto3 client
-    session = boto3.session.Session()
-    client = session.client('s3',
-                            region_name='sfo3',
-                            endpoint_url='https://sfo3.digitaloceanspaces.com',
-                            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-                            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'))
+    client = get_spaces_client()
 
     # Delete existing image URLs from Digital Ocean
     if pet_profile.profile_pic_regular:
@@ -272,5 +308,6 @@ def delete_profile_picture(request):
     pet_profile.profile_pic_regular = None
     pet_profile.profile_pic_thumbnail_small = None
     pet_profile.save()
+    invalidate_pet_profiles([pet_profile.pet_id], [pet_profile.user_id])
 
     return Response({'message': 'Profile pictures deleted successfully'})
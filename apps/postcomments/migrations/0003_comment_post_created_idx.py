@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mediaposts', '0010_storagedeletion'),
+        ('petprofiles', '0010_pet_name_lower_idx'),
+        ('postcomments', '0002_alter_postcomment_content'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postcomment',
+            index=models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created_idx'),
+        ),
+    ]
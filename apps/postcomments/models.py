@@ -13,5 +13,12 @@ class PostComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Backs the keyset-paginated comment list of a post
+            models.Index(fields=['post', '-created_at', '-id'],
+                         name='comment_post_created_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.pet_profile.pet_name} on Post {self.post.id}"
@@ -0,0 +1,10 @@
+from apps.mediaposts.pagination import KeysetPagination
+
+
+class CommentKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination over a post's comments, newest first, backed by
+    comment_post_created_idx so a page deep into a viral post's comments
+    costs the same as the first one.
+    """
+    page_size = 20
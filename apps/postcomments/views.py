@@ -1,13 +1,17 @@
+from django.db import transaction
+from django.db.models import F, OuterRef
 from django.http import HttpResponse, JsonResponse
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 
+from apps.mediaposts.counters import refresh_latest_comments
 from apps.mediaposts.models import Post
 from apps.petprofiles.models import PetProfile
-from apps.userblocking.models import BlockedUser
+from apps.userblocking.visibility import annotate_blocked, blocked_between_exists
 
 from .models import PostComment
+from .pagination import CommentKeysetPagination
 
 
 @api_view(['POST'])
@@ -18,27 +22,27 @@ def add_comment(request, post_id):
     pet_id = data.get('pet_id')
 
     try:
-        post = Post.objects.get(id=post_id)
+        post = annotate_blocked(Post.objects, request.user).get(id=post_id)
         pet_profile = PetProfile.objects.get(pet_id=pet_id, user=request.user)
     except (Post.DoesNotExist, PetProfile.DoesNotExist):
         return HttpResponse(status=404)
 
-    post_owner = post.pet.user
-
     # Check if the user is blocked or has blocked the post owner
-    if BlockedUser.objects.filter(blocker=request.user, blocked=post_owner).exists() or \
-       BlockedUser.objects.filter(blocker=post_owner, blocked=request.user).exists():
+    if post.blocked:
         return JsonResponse({'error': 'Action not allowed'}, status=403)
 
     content = data.get('content')
     if not content:
         return JsonResponse({'error': 'Content is required'}, status=400)
 
-    comment = PostComment.objects.create(
-        pet_profile=pet_profile,
-        post=post,
-        content=content
-    )
+    with transaction.atomic():
+        comment = PostComment.objects.create(
+            pet_profile=pet_profile,
+            post=post,
+            content=content
+        )
+        Post.objects.filter(pk=post.pk).update(
+            comment_count=F('comment_count') + 1, latest_comment=comment)
 
     return JsonResponse({'id': comment.id, 'content': comment.content, 'created_at': comment.created_at}, status=201)
 
@@ -57,31 +61,51 @@ def delete_comment(request, comment_id):
     if request.user != post_owner_user and request.user != comment_owner_user:
         return JsonResponse({'error': 'You do not have permission to delete this comment'}, status=403)
 
+    was_latest = comment.post.latest_comment_id == comment.id
+
     # Delete the comment
-    comment.delete()
+    with transaction.atomic():
+        comment.delete()
+        Post.objects.filter(pk=comment.post_id, comment_count__gt=0).update(
+            comment_count=F('comment_count') - 1)
+        # The post previewed this comment; fall back to the next newest one
+        if was_latest:
+            refresh_latest_comments(Post.objects.filter(pk=comment.post_id))
 
     return JsonResponse({'message': 'Comment deleted successfully'}, status=204)
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def view_comments_for_post(request, post_id):
-    blocked_users = set(BlockedUser.objects.filter(blocker=request.user).values_list('blocked', flat=True)) | \
-        set(BlockedUser.objects.filter(
-            blocked=request.user).values_list('blocker', flat=True))
+def visible_comments(post_id, user):
+    # Leave out comments by users blocked by or blocking the current user
+    return PostComment.objects.filter(post_id=post_id) \
+                              .exclude(blocked_between_exists(user, OuterRef('pet_profile__user'))) \
+                              .select_related('pet_profile')
 
-    comments = PostComment.objects.filter(post_id=post_id) \
-                                  .exclude(pet_profile__user__in=blocked_users) \
-                                  .select_related('pet_profile') \
-                                  .order_by('-created_at')
 
-    comments_data = [{
+def convert_comment_to_response_format(comment):
+    return {
         'comment_id': comment.id,
         'pet_id': comment.pet_profile.pet_id,
         'content': comment.content,
         'created_at': comment.created_at.isoformat(),
         'profile_pic_thumbnail_small': comment.pet_profile.profile_pic_thumbnail_small,
         'pet_type': comment.pet_profile.pet_type
-    } for comment in comments]
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def view_comments_for_post(request, post_id):
+    comments = visible_comments(post_id, request.user)
+
+    paginator = CommentKeysetPagination()
+    page = paginator.paginate_queryset(comments, request)
+
+    comments_data = [convert_comment_to_response_format(comment)
+                     for comment in page]
 
-    return JsonResponse({'comments': comments_data}, safe=False, status=200)
+    return JsonResponse({
+        'comments': comments_data,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    }, safe=False, status=200)
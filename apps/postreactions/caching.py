@@ -0,0 +1,25 @@
+from django.core.cache import cache
+from django.db import transaction
+
+# Like counts and likers of a post, cached per post for the public reaction
+# endpoints and invalidated whenever a post's likes change or the post or a
+# liking pet profile is deleted. Likers are cached unfiltered, with their
+# owner's user id, so each viewer's blocks can be applied on top.
+
+LIKE_COUNT_KEY = 'postreactions:like_count:{post_id}'
+LIKERS_KEY = 'postreactions:likers:{post_id}'
+
+
+def like_count_key(post_id):
+    return LIKE_COUNT_KEY.format(post_id=post_id)
+
+
+def likers_key(post_id):
+    return LIKERS_KEY.format(post_id=post_id)
+
+
+def invalidate_post_reactions(post_ids):
+    # After commit, so a concurrent read cannot cache the old data again
+    keys = [like_count_key(post_id) for post_id in post_ids]
+    keys += [likers_key(post_id) for post_id in post_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
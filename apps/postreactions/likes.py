@@ -0,0 +1,21 @@
+from django.db.models import Exists, OuterRef
+
+from .models import PostReaction
+
+# Like counts are denormalized on Post, so the like state of a whole page of
+# posts is one query: the posts annotated with whether a pet has liked them.
+
+MAX_BATCH_POST_IDS = 100
+
+
+def annotate_liked(posts, user, pet_profile_id):
+    """
+    Annotate `posts` with `liked`: whether the pet `pet_profile_id` has liked
+    the post. Always False for pets that do not belong to `user`.
+    """
+    return posts.annotate(liked=Exists(PostReaction.objects.filter(
+        post=OuterRef('pk'),
+        pet_profile_id=pet_profile_id,
+        pet_profile__user=user,
+        reaction_type='like',
+    )))
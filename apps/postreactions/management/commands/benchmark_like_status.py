@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.postreactions.models import PostReaction
+
+
+class Command(BaseCommand):
+    help = ('Measure check_like_status latency against the configured database, '
+            'with a new connection per request and with connection reuse.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of requests per mode.')
+        parser.add_argument(
+            '--post-id', type=int,
+            help='Post to check; defaults to the post of the latest like.')
+
+    def handle(self, *args, **options):
+        if options['post_id']:
+            reaction = PostReaction.objects.select_related('pet_profile__user').filter(
+                post_id=options['post_id']).first()
+        else:
+            reaction = PostReaction.objects.select_related(
+                'pet_profile__user').order_by('-id').first()
+        if reaction is None:
+            raise CommandError('Need at least one like to benchmark against')
+
+        pet_profile = reaction.pet_profile
+        url = reverse('check_like_status',
+                      args=[reaction.post_id, pet_profile.pet_id])
+        client = APIClient(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        auth_header_type = settings.SIMPLE_JWT['AUTH_HEADER_TYPES'][0]
+        client.credentials(
+            HTTP_AUTHORIZATION=f"{auth_header_type} {pet_profile.user.generate_jwt()['access']}")
+
+        configured_max_age = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            for label, max_age in (('new connection per request', 0),
+                                   ('persistent connection', None)):
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                connection.close()
+                timings = self.run_requests(client, url, options['requests'])
+                self.stdout.write(
+                    f'{label}: median {statistics.median(timings):.2f} ms, '
+                    f'p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms')
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = configured_max_age
+            connection.close()
+
+    def run_requests(self, client, url, count):
+        timings = []
+        for _ in range(count):
+            # The test client does not run the request_started/finished
+            # connection handling, so do what the WSGI handler would
+            start = time.perf_counter()
+            close_old_connections()
+            response = client.get(url)
+            close_old_connections()
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url} returned {response.status_code}')
+        return timings
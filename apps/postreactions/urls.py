@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import check_like_status, get_like_count, get_likers_of_post, like_post, unlike_post
+from .views import check_like_status, get_like_count, get_like_statuses, get_likers_of_post, like_post, unlike_post
 
 urlpatterns = [
     path('posts/<int:post_id>/like/<str:pet_profile_id>/',
@@ -12,4 +12,6 @@ urlpatterns = [
          check_like_status, name='check_like_status'),
     path('posts/<int:post_id>/likers/',
          get_likers_of_post, name='get_likers_of_post'),
+    path('posts/likestatus/<str:pet_profile_id>/',
+         get_like_statuses, name='get_like_statuses'),
 ]
@@ -1,9 +1,15 @@
-from apps.userblocking.models import BlockedUser
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from apps.userblocking.visibility import annotate_blocked, get_hidden_user_ids
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from .caching import invalidate_post_reactions, like_count_key, likers_key
+from .likes import MAX_BATCH_POST_IDS, annotate_liked
 from .models import PostReaction
 from apps.mediaposts.models import Post
 from apps.petprofiles.models import PetProfile
@@ -13,32 +19,26 @@ from apps.petprofiles.models import PetProfile
 @permission_classes([IsAuthenticated])
 def like_post(request, post_id, pet_profile_id):
     try:
-        post = Post.objects.get(pk=post_id)
+        post = annotate_blocked(Post.objects, request.user).get(pk=post_id)
         pet_profile = PetProfile.objects.get(pk=pet_profile_id)
 
-        # Fetch IDs of users who have blocked the current user
-        user_blocked_by_ids = BlockedUser.objects.filter(
-            blocked=request.user).values_list('blocker_id', flat=True)
-
-        # Fetch IDs of users who are blocked by the current user
-        blocked_by_user_ids = BlockedUser.objects.filter(
-            blocker=request.user).values_list('blocked_id', flat=True)
-
-        # Combine both lists of IDs
-        all_blocked_users_ids = set(
-            list(user_blocked_by_ids) + list(blocked_by_user_ids))
+        if pet_profile.user_id != request.user.id:
+            return Response({'message': 'Authorization error'}, status=status.HTTP_403_FORBIDDEN)
 
-        if post.pet.user.id in all_blocked_users_ids or pet_profile.user.id in all_blocked_users_ids:
+        # The liking pet is the user's own, so only the post owner can be blocked
+        if post.blocked:
             return Response({'message': 'Cannot interact with this post'}, status=status.HTTP_403_FORBIDDEN)
 
-        if pet_profile.user != request.user:
-            return Response({'message': 'Authorization error'}, status=status.HTTP_403_FORBIDDEN)
-
-        reaction, created = PostReaction.objects.get_or_create(
-            pet_profile=pet_profile,
-            post=post,
-            defaults={'reaction_type': 'like'}
-        )
+        with transaction.atomic():
+            reaction, created = PostReaction.objects.get_or_create(
+                pet_profile=pet_profile,
+                post=post,
+                defaults={'reaction_type': 'like'}
+            )
+            if created:
+                Post.objects.filter(pk=post.pk).update(
+                    like_count=F('like_count') + 1)
+                invalidate_post_reactions([post.pk])
         if not created:
             return Response({'message': 'Already liked'}, status=status.HTTP_409_CONFLICT)
         return Response({'message': 'Liked'}, status=status.HTTP_201_CREATED)
@@ -56,13 +56,17 @@ def unlike_post(request, post_id, pet_profile_id):
         if pet_profile.user != request.user:
             return Response({'message': 'Authorization error'}, status=status.HTTP_403_FORBIDDEN)
 
-        try:
-            reaction = PostReaction.objects.get(
-                pet_profile=pet_profile, post=post)
-            reaction.delete()
+        with transaction.atomic():
+            deleted, _ = PostReaction.objects.filter(
+                pet_profile=pet_profile, post=post).delete()
+            if deleted:
+                Post.objects.filter(pk=post.pk, like_count__gt=0).update(
+                    like_count=F('like_count') - 1)
+                invalidate_post_reactions([post.pk])
+
+        if deleted:
             return Response({'message': 'Unliked'}, status=status.HTTP_200_OK)
-        except PostReaction.DoesNotExist:
-            return Response({'message': 'Not liked yet'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'message': 'Not liked yet'}, status=status.HTTP_404_NOT_FOUND)
     except (Post.DoesNotExist, PetProfile.DoesNotExist):
         return Response({'message': 'Post or Pet Profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -71,9 +75,11 @@ def unlike_post(request, post_id, pet_profile_id):
 @permission_classes([AllowAny])
 def get_like_count(request, post_id):
     try:
-        post = Post.objects.get(pk=post_id)
-        like_count = PostReaction.objects.filter(
-            post=post, reaction_type='like').count()
+        like_count = cache.get_or_set(
+            like_count_key(post_id),
+            lambda: Post.objects.values_list(
+                'like_count', flat=True).get(pk=post_id),
+            settings.PUBLIC_CACHE_TIMEOUT)
         return Response({'like_count': like_count}, status=status.HTTP_200_OK)
     except Post.DoesNotExist:
         return Response({'message': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -95,6 +101,31 @@ def check_like_status(request, post_id, pet_profile_id):
     return Response({'liked': liked}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_like_statuses(request, pet_profile_id):
+    """
+    Like count and like status of `pet_profile_id` for every post in the
+    comma-separated `post_ids` query parameter, in one query. Posts that do
+    not exist are left out.
+    """
+    try:
+        post_ids = [int(post_id) for post_id in
+                    request.query_params.get('post_ids', '').split(',') if post_id]
+    except ValueError:
+        return Response({'message': 'post_ids must be a comma-separated list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(post_ids) > MAX_BATCH_POST_IDS:
+        return Response({'message': f'At most {MAX_BATCH_POST_IDS} post_ids are allowed'}, status=status.HTTP_400_BAD_REQUEST)
+
+    posts = annotate_liked(Post.objects.filter(id__in=post_ids),
+                           request.user, pet_profile_id)
+    statuses = {
+        post['id']: {'like_count': post['like_count'], 'liked': post['liked']}
+        for post in posts.values('id', 'like_count', 'liked')
+    }
+    return Response({'posts': statuses}, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_likers_of_post(request, post_id):
@@ -105,31 +136,35 @@ def get_likers_of_post(request, post_id):
     - This approach ensures that the interaction data (likes) remains intact while respecting user privacy settings.
     """
     try:
-        post = Post.objects.get(pk=post_id)
-        reactions = PostReaction.objects.filter(
-            post=post, reaction_type='like').select_related('pet_profile')
-
-        if request.user.is_authenticated:
-            # Fetch IDs of users who are blocked by the current user
-            blocked_by_user_ids = BlockedUser.objects.filter(
-                blocker=request.user).values_list('blocked_id', flat=True)
-
-            # Fetch IDs of users who have blocked the current user
-            user_blocked_by_ids = BlockedUser.objects.filter(
-                blocked=request.user).values_list('blocker_id', flat=True)
-
-            # Combine both sets of IDs
-            all_blocked_users_ids = set(
-                blocked_by_user_ids) | set(user_blocked_by_ids)
-
-            reactions = reactions.exclude(
-                pet_profile__user_id__in=all_blocked_users_ids)
-
-        likers = reactions.values(
-            'pet_profile__pet_id',
-            'pet_profile__profile_pic_thumbnail_small',
-            'pet_profile__pet_type'
-        )
-        return Response({'likers': list(likers)}, status=status.HTTP_200_OK)
+        likers = get_visible_likers(post_id, request.user)
+        return Response({'likers': likers}, status=status.HTTP_200_OK)
     except Post.DoesNotExist:
         return Response({'message': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
+
+
+def get_visible_likers(post_id, user):
+    likers = cache.get_or_set(
+        likers_key(post_id),
+        lambda: get_all_likers(post_id),
+        settings.PUBLIC_CACHE_TIMEOUT)
+
+    if user.is_authenticated:
+        hidden_user_ids = get_hidden_user_ids(user)
+        likers = [liker for liker in likers
+                  if liker['pet_profile__user_id'] not in hidden_user_ids]
+
+    return [{key: value for key, value in liker.items() if key != 'pet_profile__user_id'}
+            for liker in likers]
+
+
+def get_all_likers(post_id):
+    # Cached for every viewer, so blocks are applied by the caller
+    post = Post.objects.get(pk=post_id)
+    return list(PostReaction.objects.filter(
+        post=post, reaction_type='like'
+    ).values(
+        'pet_profile__pet_id',
+        'pet_profile__profile_pic_thumbnail_small',
+        'pet_profile__pet_type',
+        'pet_profile__user_id'
+    ))
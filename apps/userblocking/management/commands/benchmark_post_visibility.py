@@ -0,0 +1,102 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.mediaposts.models import Post
+from apps.petprofiles.models import PetProfile
+from apps.userblocking.models import BlockedUser
+from apps.userblocking.visibility import (
+    annotate_visibility,
+    get_hidden_post_ids,
+    invalidate_hidden_posts,
+    invalidate_hidden_users,
+    is_blocked_between,
+)
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Compare the post access check done by loading the block lists '
+            'with the EXISTS-based annotate_visibility, for viewers with '
+            'different numbers of blocks. The benchmark data is created in a '
+            'transaction that is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Number of checks per mode and block count.')
+        parser.add_argument(
+            '--block-counts', type=int, nargs='+', default=[0, 100, 10000],
+            help='Numbers of blocks the viewer is part of.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run_benchmarks(options['block_counts'], options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run_benchmarks(self, block_counts, count):
+        owner = User.objects.create_user(
+            'visibility-benchmark-owner@example.com', None)
+        pet = PetProfile.objects.create(
+            pet_id='visibility-benchmark', user=owner,
+            pet_name='Benchmark', pet_type='dog')
+        post = Post.objects.create(pet=pet, caption='benchmark')
+
+        others = User.objects.bulk_create(
+            User(email=f'visibility-benchmark-{i}@example.com', password='!')
+            for i in range(max(block_counts)))
+
+        for block_count in block_counts:
+            viewer = User.objects.create_user(
+                f'visibility-benchmark-viewer-{block_count}@example.com', None)
+            # Half blocked by the viewer, half blocking the viewer
+            BlockedUser.objects.bulk_create(
+                BlockedUser(blocker=viewer, blocked=other) if i % 2 else
+                BlockedUser(blocker=other, blocked=viewer)
+                for i, other in enumerate(others[:block_count]))
+
+            def materialized():
+                loaded = Post.objects.select_related('pet').get(pk=post.pk)
+                return loaded.id in get_hidden_post_ids(viewer) or \
+                    is_blocked_between(viewer, loaded.pet.user_id)
+
+            def materialized_cold():
+                invalidate_hidden_users(viewer)
+                invalidate_hidden_posts(viewer)
+                return materialized()
+
+            def exists():
+                loaded = annotate_visibility(
+                    Post.objects.select_related('pet'), viewer).get(pk=post.pk)
+                return loaded.blocked or loaded.reported
+
+            for label, check in (('block lists, cold cache', materialized_cold),
+                                 ('block lists, warm cache', materialized),
+                                 ('exists', exists)):
+                timings = self.run_checks(check, count)
+                self.stdout.write(
+                    f'{block_count} blocks, {label}: '
+                    f'median {statistics.median(timings):.2f} ms, '
+                    f'p95 {statistics.quantiles(timings, n=20)[-1]:.2f} ms')
+
+            invalidate_hidden_users(viewer)
+            invalidate_hidden_posts(viewer)
+
+    def run_checks(self, check, count):
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            check()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -3,6 +3,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .models import BlockedUser
+from .visibility import invalidate_hidden_users
 from apps.petprofiles.models import PetProfile
 
 
@@ -32,6 +33,7 @@ def block_user(request):
             blocked=display_pet_profile.user,
             display_pet_profile=display_pet_profile
         )
+        invalidate_hidden_users(request.user, display_pet_profile.user)
         return Response({'message': 'Pet profile and associated user blocked successfully.'})
 
 
@@ -45,6 +47,7 @@ def unblock_user(request):
         blocker=request.user, blocked=pet_profile.user)
     if blocked_user_relation.exists():
         blocked_user_relation.delete()
+        invalidate_hidden_users(request.user, pet_profile.user)
         return Response({'message': 'Pet profile and associated user unblocked successfully'})
     else:
         return Response({'error': "This pet profile's user is not in your block list"}, status=400)
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Exists, OuterRef, Q
+
+from apps.contentreporting.models import ReportedContent
+
+from .models import BlockedUser
+
+# Per-user sets of content the user must not see. They are read on every feed,
+# post and comment request, so they are cached and invalidated explicitly by
+# block_user, unblock_user and report_post. A block has to take effect in
+# every worker at once, so they are only cached when the cache is shared
+# between processes.
+
+HIDDEN_USERS_KEY = 'visibility:hidden_users:{user_id}'
+HIDDEN_POSTS_KEY = 'visibility:hidden_posts:{user_id}'
+
+
+def get_hidden_user_ids(user):
+    """
+    IDs of users blocked by `user` or who have blocked `user`.
+    """
+    def load():
+        blocked_by_user_ids = BlockedUser.objects.filter(
+            blocker=user).values_list('blocked_id', flat=True)
+        user_blocked_by_ids = BlockedUser.objects.filter(
+            blocked=user).values_list('blocker_id', flat=True)
+        return frozenset(blocked_by_user_ids) | frozenset(user_blocked_by_ids)
+
+    return _get_cached(HIDDEN_USERS_KEY.format(user_id=user.id), load)
+
+
+def get_hidden_post_ids(user):
+    """
+    IDs of posts reported by `user`.
+    """
+    def load():
+        return frozenset(ReportedContent.objects.filter(
+            reporter=user).values_list('reported_post_id', flat=True))
+
+    return _get_cached(HIDDEN_POSTS_KEY.format(user_id=user.id), load)
+
+
+def _get_cached(key, load):
+    # A process-local cache would only be invalidated in the worker that
+    # handled the block or report
+    if isinstance(caches['default'], LocMemCache):
+        return load()
+
+    value = cache.get(key)
+    if value is None:
+        value = load()
+        cache.set(key, value, settings.VISIBILITY_CACHE_TIMEOUT)
+    return value
+
+
+def is_blocked_between(user, other_user_id):
+    return other_user_id in get_hidden_user_ids(user)
+
+
+def blocked_between_exists(user, other_user):
+    """
+    Exists() that is true when `user` and `other_user` (usually an OuterRef to
+    a user column) have blocked each other in either direction. Filtering
+    with it keeps the block check in SQL instead of sending an IN-list of
+    get_hidden_user_ids.
+    """
+    return Exists(BlockedUser.objects.filter(
+        Q(blocker=user, blocked=other_user) |
+        Q(blocked=user, blocker=other_user)
+    ))
+
+
+def annotate_blocked(posts, user):
+    """
+    Annotate `posts` with `blocked`: whether `user` and the post's owner have
+    blocked each other. One EXISTS per post over the (blocker, blocked)
+    unique index, however many users `user` has blocked.
+    """
+    return posts.annotate(
+        blocked=blocked_between_exists(user, OuterRef('pet__user')))
+
+
+def annotate_visibility(posts, user):
+    """
+    Annotate `posts` with `blocked` (see annotate_blocked) and `reported`:
+    whether `user` has reported the post. `user` may see a post when both
+    are False, which is answered by the query that loads the post.
+    """
+    return annotate_blocked(posts, user).annotate(reported=Exists(
+        ReportedContent.objects.filter(reporter=user, reported_post=OuterRef('pk'))))
+
+
+def invalidate_hidden_users(*users):
+    # A block changes what both sides can see
+    cache.delete_many([HIDDEN_USERS_KEY.format(user_id=user.id)
+                      for user in users])
+
+
+def invalidate_hidden_posts(user):
+    cache.delete(HIDDEN_POSTS_KEY.format(user_id=user.id))
@@ -0,0 +1,97 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Work queued as rows for background workers (stored-object deletions,
+# outbound messages) shares one life cycle. A pending row is due once its
+# next_attempt_at has passed. A worker claims a batch by pushing
+# next_attempt_at past a lease, so a batch whose worker dies becomes due
+# again. Handled rows are deleted, and failed ones are retried with
+# exponential backoff until their queue gives up on them.
+
+
+def claim_due(queryset, limit, lease):
+    """
+    Lock up to `limit` due rows of `queryset` and lease them to the caller
+    for `lease` seconds. The rows need `status`, `attempts` and
+    `next_attempt_at` fields.
+    """
+    now = timezone.now()
+    leased_until = now + timedelta(seconds=lease)
+
+    with transaction.atomic():
+        rows = list(queryset.select_for_update(
+            skip_locked=True
+        ).filter(
+            status='pending', next_attempt_at__lte=now
+        ).order_by('next_attempt_at')[:limit])
+
+        queryset.model.objects.filter(id__in=[row.id for row in rows]).update(
+            attempts=F('attempts') + 1, next_attempt_at=leased_until)
+
+    for row in rows:
+        row.attempts += 1
+    return rows
+
+
+def record_failure(row, error, max_attempts, retry_delay, now=None):
+    """
+    Store `error` on a claimed row and make it due again after `retry_delay`
+    seconds, doubled on every attempt, or mark it failed once `max_attempts`
+    is reached. Returns True when the row was given up on.
+    """
+    row.last_error = error
+    given_up = row.attempts >= max_attempts
+    if given_up:
+        row.status = 'failed'
+    else:
+        delay = retry_delay * 2 ** (row.attempts - 1)
+        row.next_attempt_at = (now or timezone.now()) + timedelta(seconds=delay)
+    row.save(update_fields=['status', 'last_error', 'next_attempt_at'])
+    return given_up
+
+
+class QueueWorkerCommand(BaseCommand):
+    """
+    A command that claims batches from a queue and processes them until the
+    queue is empty, or forever with --loop. Subclasses implement claim() and
+    process(), which returns how many items it handled.
+    """
+    default_batch_size = 100
+    default_poll_interval = 5.0
+    success_message = 'Processed {count} items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling instead of exiting when nothing is due.')
+        parser.add_argument(
+            '--batch-size', type=int, default=self.default_batch_size,
+            help='Number of items claimed at a time.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=self.default_poll_interval,
+            help='Seconds to wait between polls when nothing is due.')
+
+    def claim(self, batch_size):
+        raise NotImplementedError
+
+    def process(self, batch):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        count = 0
+        while True:
+            batch = self.claim(options['batch_size'])
+            count += self.process(batch)
+
+            if not batch:
+                if not options['loop']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            self.success_message.format(count=count)))
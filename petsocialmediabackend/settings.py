@@ -14,6 +14,8 @@ import os
 from dotenv import load_dotenv
 from pathlib import Path
 from datetime import timedelta
+from botocore.config import Config
+from django.core.exceptions import ImproperlyConfigured
 from .constants import DEV, PROD
 
 load_dotenv()
@@ -171,6 +173,10 @@ if ENV == DEV:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 else:
     EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# e.g. django.core.mail.backends.filebased.EmailBackend to write mail to
+# EMAIL_FILE_PATH in tests
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', EMAIL_BACKEND)
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
 
 
 EMAIL_HOST = 'smtp.gmail.com'
@@ -184,6 +190,21 @@ DEFAULT_FROM_EMAIL = 'Petzzl Family <admin@petzzl.app>'
 # MailChimp Setup
 MAILCHIMP_API_KEY = os.getenv('MAILCHIMP_API_KEY')
 MAILCHIMP_LIST_ID = os.getenv('MAILCHIMP_LIST_ID')
+# 'api' subscribes users for real; 'console' only prints who would be added
+MAILCHIMP_BACKEND = os.getenv(
+    'MAILCHIMP_BACKEND', 'api' if ENV == PROD else 'console')
+MAILCHIMP_TIMEOUT = 10
+
+# Mailchimp subscriptions and admin emails are queued as OutboundMessage rows
+# for `manage.py process_outbound_messages` workers. 'inline' (development and
+# tests) delivers them from the request once its transaction commits instead.
+OUTBOUND_MESSAGES_BACKEND = os.getenv(
+    'OUTBOUND_MESSAGES_BACKEND', 'queue' if ENV == PROD else 'inline')
+# Delivery attempts, first retry delay and worker lease in seconds; see
+# petsocialmediabackend/outbox.py
+OUTBOUND_MESSAGES_MAX_ATTEMPTS = 5
+OUTBOUND_MESSAGES_RETRY_DELAY = 60
+OUTBOUND_MESSAGES_LEASE = 60 * 5
 
 
 ROOT_URLCONF = 'petsocialmediabackend.urls'
@@ -239,6 +260,30 @@ else:
         }
     }
 
+# Connection reuse. Each new connection to the managed database costs a TCP +
+# TLS + MySQL handshake, so by default a connection is kept for
+# DATABASE_CONN_MAX_AGE seconds (keep it below the server's wait_timeout;
+# 'none' keeps connections open indefinitely, 0 closes them after every
+# request) and pinged before being reused by a new request.
+#
+# Setting DATABASE_POOLER_HOST routes connections through an external pooler
+# such as ProxySQL instead. The pooler holds the server connections, so the
+# app opens a cheap local connection per request and leaves health checking
+# to the pooler unless overridden.
+DATABASE_POOLER_HOST = os.environ.get('DATABASE_POOLER_HOST')
+
+if DATABASE_POOLER_HOST:
+    DATABASES['default']['HOST'] = DATABASE_POOLER_HOST
+    DATABASES['default']['PORT'] = os.environ.get(
+        'DATABASE_POOLER_PORT', '6033')
+
+DATABASE_CONN_MAX_AGE = os.environ.get(
+    'DATABASE_CONN_MAX_AGE', '0' if DATABASE_POOLER_HOST else '60')
+DATABASES['default']['CONN_MAX_AGE'] = None \
+    if DATABASE_CONN_MAX_AGE.lower() == 'none' else int(DATABASE_CONN_MAX_AGE)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get(
+    'DATABASE_CONN_HEALTH_CHECKS', 'False' if DATABASE_POOLER_HOST else 'True') == 'True'
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -271,6 +316,15 @@ AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
 AWS_STORAGE_BUCKET_NAME = 'petzzl'
 AWS_S3_ENDPOINT_URL = 'https://sfo3.digitaloceanspaces.com'
+AWS_S3_REGION_NAME = 'sfo3'
+# Shared by django-storages and petsocialmediabackend.spaces
+AWS_S3_CLIENT_CONFIG = Config(
+    max_pool_connections=20,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'standard'},
+)
+# Concurrent DeleteObjects requests issued by a bulk delete
+SPACES_DELETE_THREADS = 4
 AWS_S3_OBJECT_PARAMETERS = {
     'CacheControl': 'max-age=86400',
 }
@@ -287,10 +341,125 @@ else:
 PROFILE_PIC_LOCATION = f"{ENV_FOLDER}/profile_pic"
 
 
+# Cache
+
+# Process-local memory in development and tests. Production requires
+# CACHE_REDIS_URL (redis:// or rediss://) so that cached data and its
+# invalidations are shared between workers; any Redis-compatible server works.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': ENV_FOLDER,
+        }
+    }
+elif ENV == PROD:
+    raise ImproperlyConfigured(
+        'CACHE_REDIS_URL must be set in production: a per-process cache would '
+        'only be invalidated in the worker that made the change')
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'petzzl',
+        }
+    }
+
+# Seconds the responses of public endpoints (pet profiles, like counts and
+# likers) are cached. Edits invalidate them explicitly; the timeout bounds
+# staleness for changes that do not, like a liker's new profile picture.
+PUBLIC_CACHE_TIMEOUT = 60 * 5
+
+
+# Visibility
+
+# Seconds a user's cached block/report sets live. Blocking, unblocking and
+# reporting invalidate them explicitly. They are not cached at all with the
+# process-local cache, which other workers would keep serving after a block.
+VISIBILITY_CACHE_TIMEOUT = 60 * 5
+
+
+# Feed
+
+# Serve ?pagination=cursor feed requests from the materialized per-user
+# timelines. Run `manage.py backfill_timelines` before enabling.
+FEED_TIMELINE_ENABLED = os.environ.get('FEED_TIMELINE_ENABLED') == 'True'
+
+# Users posting more than this in 24 hours are not fanned out on write;
+# their posts are merged into feeds at read time.
+FEED_FANOUT_MAX_DAILY_POSTS = 50
+
+# Number of recent posts copied into a timeline when it is (re)built, and
+# the most a timeline keeps; fan-out drops older entries past it.
+FEED_TIMELINE_BACKFILL_SIZE = 500
+
+# New posts are queued as TimelineFanOut rows for
+# `manage.py process_timeline_fan_outs` workers. 'inline' (development and
+# tests) fans them out from the request once its transaction commits instead.
+FEED_FANOUT_BACKEND = os.environ.get(
+    'FEED_FANOUT_BACKEND', 'queue' if ENV == PROD else 'inline')
+# Fan-out attempts, first retry delay and worker lease in seconds; see
+# petsocialmediabackend/outbox.py
+FEED_FANOUT_MAX_ATTEMPTS = 5
+FEED_FANOUT_RETRY_DELAY = 60
+FEED_FANOUT_LEASE = 60 * 10
+
+
+# Media Processing
+
+# Uploaded images are stored and queued as MediaProcessingJob rows for
+# `manage.py process_media_jobs` workers. 'inline' (development and tests)
+# processes them in the request that creates the post instead.
+MEDIA_PROCESSING_BACKEND = os.environ.get(
+    'MEDIA_PROCESSING_BACKEND', 'queue' if ENV == PROD else 'inline')
+MEDIA_PROCESSING_MAX_ATTEMPTS = 3
+# Seconds after which a running job is assumed abandoned and retried
+MEDIA_PROCESSING_STALE_AFTER = 60 * 10
+
+# Worker processes decoding/resizing/encoding the images of a post (1 keeps
+# it in the calling process) and threads uploading the resulting variants
+IMAGE_PROCESSING_WORKERS = int(os.environ.get(
+    'IMAGE_PROCESSING_WORKERS', min(os.cpu_count() or 1, 4)))
+IMAGE_UPLOAD_THREADS = 8
+
+# Encodings generated next to the JPEG variants and served to clients that
+# accept them. Add 'avif' on hosts whose Pillow build supports it.
+MEDIA_EXTRA_IMAGE_FORMATS = ['webp']
+
+
+# Storage Cleanup
+
+# Stored objects of deleted posts, pet profiles and accounts are queued in the
+# StorageDeletion outbox together with the row deletes, for
+# `manage.py process_storage_deletions` workers. 'inline' (development and
+# tests) deletes them from the request once its transaction commits instead.
+STORAGE_CLEANUP_BACKEND = os.environ.get(
+    'STORAGE_CLEANUP_BACKEND', 'queue' if ENV == PROD else 'inline')
+# Delete attempts, first retry delay and worker lease in seconds; see
+# petsocialmediabackend/outbox.py
+STORAGE_CLEANUP_MAX_ATTEMPTS = 8
+STORAGE_CLEANUP_RETRY_DELAY = 60
+STORAGE_CLEANUP_LEASE = 60 * 5
+
+
 # Apple
 
 APPLE_CLIENT_ID = os.getenv('APPLE_CLIENT_ID')
 
+# Apple's token signing keys; overridable to point at a local stub
+APPLE_KEYS_URL = os.getenv('APPLE_KEYS_URL', 'https://appleid.apple.com/auth/keys')
+APPLE_KEYS_TIMEOUT = 5
+# Seconds the keys are cached when Apple sends no Cache-Control max-age
+APPLE_KEYS_DEFAULT_TTL = 60 * 60
+# Minimum seconds between refreshes triggered by tokens with unknown key ids
+APPLE_KEYS_MIN_REFRESH_INTERVAL = 60
+# Seconds the current keys keep being served after a failed refresh before
+# the next attempt
+APPLE_KEYS_FAILURE_BACKOFF = 60
+
 if ENV == PROD:
     LOGGING = {
         'version': 1,
@@ -0,0 +1,93 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import boto3
+from django.conf import settings
+
+# boto3 clients are thread-safe and keep a pool of keep-alive connections, so
+# one client per process is shared by every delete path instead of building a
+# new client (and TLS connection) for each call.
+
+# Maximum number of keys S3 accepts in a single DeleteObjects request
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_spaces_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Sessions are not thread-safe; use a private one to build the client
+                session = boto3.session.Session()
+                _client = session.client(
+                    's3',
+                    region_name=settings.AWS_S3_REGION_NAME,
+                    endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    config=settings.AWS_S3_CLIENT_CONFIG,
+                )
+    return _client
+
+
+def parse_spaces_url(url):
+    """
+    Split a Spaces object URL into (bucket name, object key).
+    """
+    parsed_url = urlparse(url)
+    path_parts = parsed_url.path.lstrip('/').split('/')
+    bucket_name = path_parts[0]
+    object_name = '/'.join(path_parts[1:])
+    return bucket_name, object_name
+
+
+def delete_objects_by_url(urls):
+    """
+    Delete the objects behind `urls` with DeleteObjects requests of up to
+    DELETE_OBJECTS_BATCH_SIZE keys, sent concurrently.
+
+    Returns a list of (url, error message) for every object that could not be
+    deleted; an empty list means everything was deleted.
+    """
+    urls_by_bucket = defaultdict(dict)
+    for url in urls:
+        if url:
+            bucket_name, object_name = parse_spaces_url(url)
+            urls_by_bucket[bucket_name][object_name] = url
+
+    batches = []
+    for bucket_name, urls_by_key in urls_by_bucket.items():
+        keys = list(urls_by_key)
+        for start in range(0, len(keys), DELETE_OBJECTS_BATCH_SIZE):
+            batches.append(
+                (bucket_name, keys[start:start + DELETE_OBJECTS_BATCH_SIZE]))
+
+    if not batches:
+        return []
+
+    max_workers = min(len(batches), settings.SPACES_DELETE_THREADS)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_delete_batch, batches))
+
+    return [(urls_by_bucket[bucket_name][object_name], message)
+            for batch_failures in results
+            for bucket_name, object_name, message in batch_failures]
+
+
+def _delete_batch(batch):
+    bucket_name, keys = batch
+    try:
+        response = get_spaces_client().delete_objects(
+            Bucket=bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+        )
+    except Exception as e:
+        return [(bucket_name, key, str(e)) for key in keys]
+
+    return [(bucket_name, error['Key'], error.get('Message', error.get('Code', '')))
+            for error in response.get('Errors', [])]